@@ -0,0 +1,309 @@
+"""
+Copyright (C) 2013 Matthew Woodruff and Jon Herman.
+
+This script is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This script is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License
+along with this script. If not, see <http://www.gnu.org/licenses/>.
+===========================================================
+benchmark.py
+
+Time pareto.py on synthetic data and report the results as JSON, one
+record per line, so that results from different releases can be
+compared.
+
+Example:
+    python benchmark.py --sizes 1000 100000 --nobjs 2 5 --output bench.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import itertools
+import random
+import argparse
+import platform
+import tempfile
+
+import pareto
+
+def linear(rng, nobj):
+    """ a point near the simplex sum(f) = 1, like DTLZ1 """
+    point = [rng.random() for _ in range(nobj)]
+    total = sum(point)
+    return [x / total + 0.05 * rng.random() for x in point]
+
+def sphere(rng, nobj):
+    """ a point near the unit sphere, like DTLZ2 """
+    point = [abs(rng.gauss(0, 1)) for _ in range(nobj)]
+    norm = math.sqrt(sum([x * x for x in point])) or 1.0
+    return [x / norm + 0.05 * rng.random() for x in point]
+
+def disconnected(rng, nobj):
+    """ a point near a disconnected front, like DTLZ7 """
+    point = [rng.random() for _ in range(nobj - 1)]
+    last = nobj - sum([x * (1 + math.sin(3 * math.pi * x)) for x in point])
+    return point + [last + 0.05 * rng.random()]
+
+def cloud(rng, nobj):
+    """ a point in the unit hypercube """
+    return [rng.random() for _ in range(nobj)]
+
+def nondominated(rng, nobj):
+    """ a point exactly on the simplex, so every point is nondominated """
+    point = [rng.random() for _ in range(nobj)]
+    total = sum(point)
+    return [x / total for x in point]
+
+GENERATORS = {
+    "linear": linear,
+    "sphere": sphere,
+    "disconnected": disconnected,
+    "cloud": cloud,
+    "nondominated": nondominated,
+}
+
+def generate(generator, nrow, nobj, seed):
+    """ a table of nrow rows: nobj objectives and a row number """
+    rng = random.Random(seed)
+    function = GENERATORS[generator]
+    return [function(rng, nobj) + [float(ii)] for ii in range(nrow)]
+
+def worst_first(table, nobj, rng):
+    """ rows in descending order of their objective sums """
+    return sorted(table, key=lambda row: -sum(row[:nobj]))
+
+def shuffled(table, nobj, rng):
+    """ rows in random order """
+    table = list(table)
+    rng.shuffle(table)
+    return table
+
+ORDERS = {
+    "given": lambda table, nobj, rng: table,
+    "worst-first": worst_first,
+    "shuffled": shuffled,
+}
+# worst-first is the adversarial order for an archive: every row dominates
+# some of the ones before it, so members are evicted over and over.
+
+def write_table(table, stream):
+    """ write a table as space-delimited text """
+    for row in table:
+        stream.write(" ".join([repr(x) for x in row]))
+        stream.write("\n")
+
+def bench_list(table, objectives, epsilons, options):
+    """ eps_sort on a list of lists """
+    return len(pareto.eps_sort([table], objectives, epsilons,
+                               archive=options.archive,
+                               algorithm=options.algorithm,
+                               presort=options.presort,
+                               stats=options.stats))
+
+def bench_ndarray(table, objectives, epsilons, options):
+    """ eps_sort on an ndarray, which uses eps_sort_indices """
+    np = pareto.get_numpy()
+    mat = np.array(table)
+    return len(pareto.eps_sort(mat, objectives, epsilons))
+
+def bench_flag(table, objectives, epsilons, options):
+    """ flag_nondominated on an ndarray """
+    np = pareto.get_numpy()
+    mat = np.array(table)
+    return int(pareto.flag_nondominated(mat, objectives, epsilons).sum())
+
+def bench_merge(table, objectives, epsilons, options):
+    """ eps_sort on eight shards of the table with options.jobs processes """
+    step = len(table) // 8 + 1
+    tables = [table[start:start + step]
+              for start in range(0, len(table), step)]
+    return len(pareto.eps_sort(tables, objectives, epsilons,
+                               archive=options.archive,
+                               algorithm=options.algorithm,
+                               presort=options.presort,
+                               jobs=options.jobs))
+
+def bench_merge_ndarray(table, objectives, epsilons, options):
+    """
+    eps_sort on eight ndarray shards of the table with options.jobs
+    processes, which share the objectives instead of pickling them
+    """
+    np = pareto.get_numpy()
+    step = len(table) // 8 + 1
+    tables = [np.array(table[start:start + step])
+              for start in range(0, len(table), step)]
+    return len(pareto.eps_sort(tables, objectives, epsilons,
+                               jobs=options.jobs))
+
+def bench_rank(table, objectives, epsilons, options):
+    """ eps_rank on a list of lists, ranking every row """
+    ranks = pareto.eps_rank([table], objectives, epsilons)[0]
+    return ranks.count(1)
+
+def cli_bench(*flags):
+    """ make a benchmark of the full text path, with extra cli flags """
+    def bench_cli(filename, objectives, epsilons, options):
+        """ the command-line interface, reading the table from a file """
+        argv = ["pareto.py", filename, "-o"]
+        argv.extend([str(oo) for oo in objectives])
+        argv.append("-e")
+        argv.extend([repr(eps) for eps in epsilons])
+        output = filename + ".out"
+        if "--mmap" not in flags: # always a CompactArchive
+            argv.extend(["--archive", options.archive])
+        argv.extend(["--algorithm", options.algorithm, "--output", output])
+        argv.extend(flags)
+        args = pareto.get_args(argv)
+        try:
+            pareto.cli(args)
+        finally:
+            for fp in args.inputs:
+                fp.close()
+        with open(output) as stream:
+            frontsize = sum([1 for _ in stream])
+        os.remove(output)
+        return frontsize
+    return bench_cli
+
+BENCHMARKS = {
+    "list": (bench_list, False, False),
+    "ndarray": (bench_ndarray, True, False),
+    "flag": (bench_flag, True, False),
+    "merge": (bench_merge, False, False),
+    "merge-ndarray": (bench_merge_ndarray, True, False),
+    "rank": (bench_rank, False, False),
+    "cli": (cli_bench(), False, True),
+    "cli-bulk": (cli_bench("--bulk"), False, True),
+    "cli-mmap": (cli_bench("--mmap"), False, True),
+}
+# name: (function, needs NumPy, reads a file)
+
+PRESORTED = ("list", "merge")
+# benchmarks that are timed with each of --presorts
+
+def get_args(argv):
+    """ Get command line arguments """
+    prog = argv.pop(0)
+    parser = argparse.ArgumentParser(prog=prog,
+        description='Benchmarks for pareto.py')
+    parser.add_argument("-b", "--benchmarks", nargs="+",
+                        choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS),
+                        help="benchmarks to run, default all")
+    parser.add_argument("-g", "--generators", nargs="+",
+                        choices=sorted(GENERATORS),
+                        default=["cloud", "linear", "nondominated"],
+                        help="synthetic data sets")
+    parser.add_argument("-n", "--sizes", type=int, nargs="+",
+                        default=[1000, 10000],
+                        help="numbers of rows, e.g. 1000 up to 10000000")
+    parser.add_argument("-k", "--nobjs", type=int, nargs="+",
+                        default=[2, 3, 5],
+                        help="numbers of objectives, 2 to 10")
+    parser.add_argument("-e", "--epsilons", type=float, nargs="+",
+                        default=[0.1, 0.01],
+                        help="epsilon granularities, used for every "
+                             "objective")
+    parser.add_argument("--archive", choices=sorted(pareto.ARCHIVES),
+                        default="box", help="archive for the sort")
+    parser.add_argument("--algorithm", choices=pareto.ALGORITHMS,
+                        default="archive", help="algorithm for the sort")
+    parser.add_argument("--orders", nargs="+", choices=sorted(ORDERS),
+                        default=["given", "worst-first"],
+                        help="orders of the rows, worst-first to make the "
+                             "archive evict as much as it can")
+    parser.add_argument("--presorts", nargs="+",
+                        choices=["none"] + list(pareto.PRESORTS),
+                        default=["none", "sum"],
+                        help="presorts to time the list and merge "
+                             "benchmarks with")
+    parser.add_argument("-j", "--jobs", type=int, default=2,
+                        help="worker processes for the merge benchmarks")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                        help="time each case this many times, report best")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--output", type=argparse.FileType("w"),
+                        default=sys.stdout,
+                        help="output filename, default to standard output")
+    args = parser.parse_args(argv)
+    args.presorts = [None if presort == "none" else presort
+                     for presort in args.presorts]
+    return args
+
+def time_case(function, table, data, objectives, epsilons, args):
+    """
+    time one case args.repeat times
+    return the best time, the front size and the SortStats of the last run
+    """
+    best = None
+    for _ in range(args.repeat):
+        args.stats = pareto.SortStats()
+        rows = [list(row) for row in table] if data is None else data
+        start = time.time()
+        frontsize = function(rows, objectives, epsilons, args)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, frontsize, args.stats
+
+def run(args):
+    """ run the benchmarks, writing a JSON record for each case """
+    hasnumpy = pareto.get_numpy() is not None
+    for generator, nobj, nrow, order in itertools.product(
+            args.generators, args.nobjs, args.sizes, args.orders):
+        table = generate(generator, nrow, nobj, args.seed)
+        table = ORDERS[order](table, nobj, random.Random(args.seed))
+        objectives = list(range(nobj))
+        filename = None
+        for name in args.benchmarks:
+            function, needsnumpy, readsfile = BENCHMARKS[name]
+            if needsnumpy and not hasnumpy:
+                continue
+            if readsfile and filename is None:
+                fd, filename = tempfile.mkstemp(suffix=".txt")
+                with os.fdopen(fd, "w") as stream:
+                    write_table(table, stream)
+            presorts = args.presorts if name in PRESORTED else [None]
+            for epsilon, presort in itertools.product(args.epsilons,
+                                                      presorts):
+                args.presort = presort
+                best, frontsize, stats = time_case(
+                    function, table, filename if readsfile else None,
+                    objectives, [epsilon] * nobj, args)
+                record = {
+                    "benchmark": name,
+                    "generator": generator,
+                    "rows": nrow,
+                    "objectives": nobj,
+                    "epsilon": epsilon,
+                    "archive": args.archive,
+                    "algorithm": args.algorithm,
+                    "seconds": best,
+                    "rows_per_second": nrow / best if best else None,
+                    "front": frontsize,
+                    "order": order,
+                    "presort": presort,
+                    "comparisons": stats.comparisons or None,
+                    "evictions": stats.evictions
+                                 if stats.comparisons else None,
+                    "pareto_version": pareto.__version__,
+                    "python": platform.python_version(),
+                    "implementation": platform.python_implementation(),
+                }
+                args.output.write(json.dumps(record, sort_keys=True))
+                args.output.write("\n")
+                args.output.flush()
+        if filename is not None:
+            os.remove(filename)
+
+if __name__ == "__main__":
+    run(get_args(sys.argv))
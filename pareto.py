@@ -53,12 +53,17 @@ For a fast nondominated sort:
 """
 __version__ = "1.1.1-3"
 
+import os
 import sys
 import math
-import argparse
+import time
+import bisect
+from array import array
+from collections import OrderedDict
 
 def get_args(argv):
     """ Get command line arguments """
+    import argparse # only the command line needs it, see main
     prog = argv.pop(0)
     parser = argparse.ArgumentParser(prog=prog,
         description='Nondomination Sort for Multiple Files')
@@ -82,6 +87,17 @@ def get_args(argv):
     delimiters.add_argument('--tabs', action="store_true",
                         help="use tabs as delimiter")
 
+    parser.add_argument("--input-format", choices=["auto", "text", "binary"],
+                        default="auto",
+                        help='format of the inputs, default to "auto": '\
+                        'binary for files starting with the binary front '\
+                        'signature, text for anything else')
+    parser.add_argument("--output-format", choices=["text", "binary"],
+                        default="text",
+                        help='format of the output, default to "text".  '\
+                        '"binary" writes objective columns as float64, '\
+                        'provenance as int64 and the text of each row, '\
+                        'see BinaryFront.')
     parser.add_argument('--print-only-objectives', action='store_true',
                         default=False, help='print only objectives in output')
     parser.add_argument("--blank", action="store_true",
@@ -92,6 +108,10 @@ def get_args(argv):
                         help="number of header lines to skip")
     parser.add_argument("--contribution", action="store_true",
                         help="append filename where solution originated")
+    parser.add_argument("--contribution-summary", action="store_true",
+                        help='report how many rows of the front came '\
+                        'from each input, and what percentage, on '\
+                        'standard error, without changing the rows')
     parser.add_argument("--line-number", action="store_true",
                         help="also append line number to solution if "\
                              "--contribution is used.")
@@ -101,7 +121,96 @@ def get_args(argv):
                         'at the end of a row of unknown length.  Make sure '\
                         '-e and -m are consistent with the order you '\
                         'specify.')
-
+    parser.add_argument("--archive", choices=sorted(ARCHIVES), default="box",
+                        help='archive implementation, default to "box" '\
+                        '(indexed by epsilon box).  "list" is the original '\
+                        'linear scan.  "compact" stores members in flat '\
+                        'arrays.  All give the same output.')
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="archive",
+                        help='sort algorithm, default to "archive" (sort '\
+                        'solutions into the archive one at a time).  "kung" '\
+                        'uses divide and conquer, which is faster for large '\
+                        'fronts but holds one solution per box in memory.  '\
+                        '"grid" keeps the best solution in each box in one '\
+                        'pass and then sorts only those into the archive, '\
+                        'which is faster when many solutions share boxes.')
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help='number of worker processes, default 1.  Input '\
+                        'files, or byte ranges of large input files, are '\
+                        'sorted in parallel and the results merged.')
+    parser.add_argument("--bulk", action="store_true",
+                        help='read and parse inputs many lines at a time.  '\
+                        'Much faster with NumPy installed.')
+    parser.add_argument("--prefetch", type=int, default=0,
+                        help='read ahead in up to PREFETCH upcoming input '\
+                        'files in background threads while earlier ones '\
+                        'are sorted, about 16 megabytes ahead in each, '\
+                        'default 0 (read each file when its turn comes)')
+    parser.add_argument("--mmap", action="store_true",
+                        help='memory-map the inputs and keep only the '\
+                        'location of each solution in the archive, copying '\
+                        'output rows straight from the inputs')
+    parser.add_argument("--snapshot-rows", type=int, default=0,
+                        help='print the front after every SNAPSHOT_ROWS '\
+                        'input rows, with a blank line after each front')
+    parser.add_argument("--snapshot-seconds", type=float, default=0,
+                        help='print the front when at least this many '\
+                        'seconds have passed since it was last printed')
+    parser.add_argument("--window-rows", type=int, default=0,
+                        help='keep only the front of the last WINDOW_ROWS '\
+                        'input rows, restoring rows that were dominated '\
+                        'only by rows that have since left the window')
+    parser.add_argument("--window-seconds", type=float, default=0,
+                        help='keep only the front of the rows read in the '\
+                        'last WINDOW_SECONDS seconds')
+    parser.add_argument("--follow", action="store_true",
+                        help='keep reading the last input as it grows, '\
+                        'like tail -f, until interrupted')
+    parser.add_argument("--ranks", type=int, default=0,
+                        help='output the rows of the first RANKS '\
+                        'epsilon-nondominated fronts, front by front, '\
+                        'with the rank of each row appended')
+    parser.add_argument("--cache", type=str, default=None,
+                        help='directory in which to keep the front of each '\
+                        'input file, keyed by a hash of its contents and '\
+                        'of the sort options, so unchanged files are not '\
+                        'sorted again next time')
+    parser.add_argument("--cache-size", type=float, default=1024,
+                        help='megabytes to keep in the --cache directory, '\
+                        'default 1024.  The least recently used fronts are '\
+                        'removed first.')
+    parser.add_argument("--metrics", nargs="*", choices=METRICS,
+                        help='report quality metrics of the front on '\
+                        'standard error: "hypervolume" (needs '\
+                        '--reference-point), "epsilon" (additive epsilon '\
+                        'indicator) and "gd" (generational distance), '\
+                        'which need --reference-set.  With no names, '\
+                        'report those that the reference options allow.')
+    parser.add_argument("--reference-point", type=float, nargs="+",
+                        help='reference point for hypervolume, one value '\
+                        'per objective')
+    parser.add_argument("--reference-set", type=argparse.FileType('r'),
+                        help='file of reference points for --metrics, '\
+                        'with the same columns and format as the inputs')
+    parser.add_argument("--samples", type=int, default=100000,
+                        help='Monte Carlo samples for hypervolume with '\
+                        'more than six objectives, default 100000')
+    parser.add_argument("--memory-limit", type=float, default=0,
+                        help='megabytes of solutions to hold in memory.  '\
+                        'When the front grows past this, it is spilled to '\
+                        'a temporary file (in TMPDIR) and the spilled '\
+                        'fronts are merged on disk at the end.  Default 0, '\
+                        'no limit.')
+    parser.add_argument("--target-size", type=int, default=0,
+                        help='scale the epsilons (or, without -e, the '\
+                        'range of each objective) to give a front of at '\
+                        'most TARGET_SIZE rows, and report the scaled '\
+                        'epsilons on standard error')
+    parser.add_argument("--stats", action="store_true",
+                        help='report rows read, box comparisons, evictions, '\
+                        'peak archive size and the time spent in each '\
+                        'stage on standard error.  Timing adds some '\
+                        'overhead of its own.')
 
     args = parser.parse_args(argv)
 
@@ -117,6 +226,63 @@ def get_args(argv):
     if args.tabs:
         args.delimiter = "\t"
 
+    if args.follow and args.snapshot_rows <= 0 and \
+            args.snapshot_seconds <= 0:
+        # the end of the input never comes, so nothing would be printed
+        parser.error("--follow needs --snapshot-rows or --snapshot-seconds")
+
+    # the mode cli will run in, which decides what else is honoured
+    mode = None
+    if args.ranks > 0:
+        mode = "--ranks"
+    elif args.window_rows > 0 or args.window_seconds > 0:
+        mode = "the window options"
+    elif args.snapshot_rows > 0 or args.snapshot_seconds > 0 or \
+            args.follow:
+        mode = "the snapshot options"
+    elif args.mmap:
+        mode = "--mmap"
+    elif args.cache is not None:
+        mode = "--cache"
+    elif args.target_size > 0:
+        mode = "--target-size"
+    elif args.memory_limit > 0:
+        mode = "--memory-limit"
+    elif args.jobs > 1:
+        mode = "--jobs"
+    snapshots = ("the snapshot options", "the window options")
+    unsupported = [
+        ("--output-format binary", args.output_format == "binary",
+         ("--ranks", "--mmap") + snapshots),
+        ("--contribution-summary", args.contribution_summary,
+         ("--ranks", "--target-size", "--memory-limit") + snapshots),
+        ("--metrics", args.metrics is not None, ("--ranks",) + snapshots),
+        ("--prefetch", args.prefetch > 0,
+         ("--ranks", "--mmap", "--cache", "--target-size", "--jobs")
+         + snapshots),
+        ("--jobs", args.jobs > 1,
+         ("--ranks", "--mmap", "--target-size", "--memory-limit")
+         + snapshots),
+        ("--algorithm", args.algorithm != "archive",
+         ("--ranks", "--memory-limit") + snapshots),
+        ("--archive", args.archive != "box",
+         ("--ranks", "--mmap", "the window options")),
+        ("--bulk", args.bulk, ("--ranks", "--mmap", "--target-size")
+         + snapshots),
+        ("--cache", args.cache is not None, ("--ranks", "--mmap")
+         + snapshots),
+        ("--target-size", args.target_size > 0,
+         ("--ranks", "--mmap", "--cache") + snapshots),
+        ("--memory-limit", args.memory_limit > 0,
+         ("--ranks", "--mmap", "--cache", "--target-size") + snapshots),
+        ("--mmap", args.mmap, ("--ranks",) + snapshots),
+        ("the snapshot options", mode in snapshots, ("--ranks",)),
+    ]
+    for option, given, modes in unsupported:
+        if given and mode in modes:
+            parser.error("{0} is not supported with {1}".format(option,
+                                                                mode))
+
     return args
 
 def rerange(intranges):
@@ -170,6 +336,165 @@ def intrange(arg):
 
 class SortParameterError(Exception): pass
 
+class SortStats(object):
+    """
+    Counters and timings for a sort, for finding out where the time goes.
+
+    Give one to an archive as its stats attribute (or to
+    eps_sort_solutions) to count what happens as solutions are sorted
+    into it:
+    candidates:   solutions sorted into the archive
+    comparisons:  comparisons of a candidate's box with a member's box,
+                  which came out one of four ways:
+    nondominated: neither box dominated the other
+    dominated:    the member dominated the candidate
+    dominates:    the candidate dominated the member
+    samebox:      they were in the same box
+    evictions:    members removed from the archive
+    peak:         largest number of members at once
+
+    Pipeline stages are timed with enter and timed.  Time is charged to
+    one stage at a time, so the stage times add up to the total.
+    """
+    clock = staticmethod(getattr(time, "perf_counter", time.time))
+
+    def __init__(self):
+        self.candidates = 0
+        self.comparisons = 0
+        self.nondominated = 0
+        self.dominated = 0
+        self.dominates = 0
+        self.samebox = 0
+        self.evictions = 0
+        self.peak = 0
+        self.counts = OrderedDict()  # stage -> number of items produced
+        self.seconds = OrderedDict() # stage -> seconds spent
+        self.stage = None
+        self.last = None
+
+    def enter(self, stage):
+        """
+        charge the time since the last call to the current stage and
+        make stage current, or stop timing if stage is None.
+        Return the previous stage.
+        """
+        now = self.clock()
+        previous = self.stage
+        if previous is not None:
+            self.seconds[previous] += now - self.last
+        if stage is not None:
+            self.seconds.setdefault(stage, 0.0)
+        self.stage = stage
+        self.last = now
+        return previous
+
+    def count(self, stage, number=1):
+        """ count items produced by stage """
+        self.counts[stage] = self.counts.get(stage, 0) + number
+
+    def add(self, other):
+        """ add the counters and timings of other, from another process """
+        for name in ("candidates", "comparisons", "nondominated",
+                     "dominated", "dominates", "samebox", "evictions"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.peak = max(self.peak, other.peak)
+        for stage, number in other.counts.items():
+            self.count(stage, number)
+        for stage, seconds in other.seconds.items():
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def report(self, stream):
+        """ write the counters and timings to stream, one per line """
+        lines = []
+        for stage, label in (("read", "rows read"), ("parse", "rows parsed")):
+            if stage in self.counts:
+                lines.append((label, self.counts[stage]))
+        lines.extend([
+            ("candidates", self.candidates),
+            ("comparisons", self.comparisons),
+            ("  nondominated", self.nondominated),
+            ("  dominated", self.dominated),
+            ("  dominates", self.dominates),
+            ("  same box", self.samebox),
+            ("evictions", self.evictions),
+            ("peak archive size", self.peak)])
+        for label, value in lines:
+            stream.write("{0:<20}{1}\n".format(label, value))
+        stream.write("seconds\n")
+        for stage, seconds in self.seconds.items():
+            stream.write("  {0:<18}{1:.3f}\n".format(stage, seconds))
+        stream.write("  {0:<18}{1:.3f}\n".format(
+            "total", sum(self.seconds.values())))
+
+def timed(iterable, stats, stage, size=None):
+    """
+    generator of the items of iterable that charges the time spent
+    producing them to stage in stats, and counts them, or counts
+    size(item) for each item if size is given
+    """
+    iterator = iter(iterable)
+    while True:
+        previous = stats.enter(stage)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.enter(previous)
+            return
+        stats.enter(previous)
+        stats.count(stage, 1 if size is None else size(item))
+        yield item
+
+class SourceCounts(object):
+    """
+    The number of archive members from each source (input file), kept
+    up to date as members are added and removed, for
+    --contribution-summary.
+
+    Give one to an archive as its sources attribute, and set its source
+    attribute to the index of the source before sorting solutions from
+    it into the archive.  Archives tell it about each member they add or
+    remove by a key that identifies the member while it's in the
+    archive.
+    """
+    def __init__(self, names):
+        """ names: names of the sources, in order """
+        self.names = list(names)
+        self.counts = [0] * len(self.names)
+        self.source = 0     # index of the source being sorted
+        self.members = {}   # member key -> index of its source
+
+    def add(self, key, source=None):
+        """
+        count a member added to the archive from source, default to the
+        current source
+        """
+        if source is None:
+            source = self.source
+        self.members[key] = source
+        self.counts[source] += 1
+
+    def remove(self, key):
+        """ stop counting a member that left the archive """
+        self.counts[self.members.pop(key)] -= 1
+
+    def rekey(self, keys):
+        """ rename members, after an archive renumbers its slots """
+        self.members = dict((keys[key], source)
+                            for key, source in self.members.items())
+
+    def report(self, stream):
+        """ write the count and percentage of members from each source """
+        total = sum(self.counts)
+        width = max([len(name) for name in self.names] + [6]) + 2
+        stream.write("{0:<{1}}{2:>10}{3:>10}\n".format("source", width,
+                                                      "rows", "percent"))
+        for name, count in zip(self.names, self.counts):
+            percent = 100.0 * count / total if total else 0.0
+            stream.write("{0:<{1}}{2:>10}{3:>10.1f}\n".format(
+                name, width, count, percent))
+        stream.write("{0:<{1}}{2:>10}{3:>10.1f}\n".format(
+            "total", width, total, 100.0 if total else 0.0))
+
 class Archive(object):
     """
     An archive of epsilon-nondominated solutions.
@@ -189,19 +514,98 @@ class Archive(object):
         self.boxes = []         # remember for efficiency
         self.epsilons = epsilons
         self.itobj = range(len(epsilons)) # infer number of objectives
+        self.journal = None     # additions and removals, see sortinto_many
+        self.stats = None       # a SortStats to count comparisons in
+        self.sources = None     # a SourceCounts to count members by source
+
+    def __len__(self):
+        return len(self.archive)
 
     def add(self, objectives, tagalong, ebox):
         """ add a solution to the archive, plus auxiliary information """
         self.archive.append(objectives)
         self.tagalongs.append(tagalong)
         self.boxes.append(ebox)
+        if self.journal is not None:
+            self.journal.append((True, id(objectives), objectives, tagalong))
+        if self.sources is not None:
+            self.sources.add(id(objectives))
 
     def remove(self, index):
         """ remove a solution from the archive """
+        if self.journal is not None:
+            objectives = self.archive[index]
+            self.journal.append((False, id(objectives), objectives,
+                                 self.tagalongs[index]))
+        if self.sources is not None:
+            self.sources.remove(id(self.archive[index]))
         self.archive.pop(index)
         self.tagalongs.pop(index)
         self.boxes.pop(index)
 
+    def snapshot(self):
+        """
+        return the current front as a list of (objectives, tagalong)
+        tuples, in archive order
+        """
+        return list(zip(self.archive, self.tagalongs))
+
+    def sortinto_many(self, solutions):
+        """
+        Sort a batch of solutions into the archive, for keeping a front
+        up to date as solutions arrive.
+
+        solutions: iterable of (objectives, tagalong) tuples
+        Return (added, evicted), lists of (objectives, tagalong) tuples.
+        added: solutions from this batch that are now in the archive.
+        evicted: solutions that were in the archive before this batch
+                 and aren't any more.
+        Solutions that came and went during the batch are in neither.
+        """
+        self.journal = []
+        try:
+            for objectives, tagalong in solutions:
+                self.sortinto(objectives, tagalong)
+            journal = self.journal
+        finally:
+            self.journal = None
+
+        # Journal entries carry a key that identifies the archive member,
+        # to match removals with additions.
+        added = OrderedDict()
+        evicted = []
+        for isaddition, key, objectives, tagalong in journal:
+            if isaddition:
+                added[key] = (objectives, tagalong)
+            elif key in added:
+                del added[key]
+            else:
+                evicted.append((objectives, tagalong))
+        return list(added.values()), evicted
+
+    def tally(self, comparisons, dominates, samebox, added):
+        """
+        count the outcome of sorting one candidate into the archive in
+        self.stats.  Called once per candidate, so that the comparison
+        loops don't pay for counting.
+
+        comparisons: number of members the candidate was compared with
+        dominates:   number of members it dominated
+        samebox:     1 if it shared a box with a member, otherwise 0
+        added:       True if it was added to the archive
+        """
+        stats = self.stats
+        dominated = 0 if added or samebox else 1
+        stats.candidates += 1
+        stats.comparisons += comparisons
+        stats.dominated += dominated
+        stats.dominates += dominates
+        stats.samebox += samebox
+        stats.nondominated += comparisons - dominated - dominates - samebox
+        stats.evictions += dominates + (samebox if added else 0)
+        if added and len(self) > stats.peak:
+            stats.peak = len(self)
+
     def sortinto(self, objectives, tagalong=None):
         """
         Sort a solution into the archive.  Add it if it's nondominated
@@ -227,6 +631,8 @@ class Archive(object):
                 for ii in self.itobj]
 
         asize = len(self.archive)
+        size0 = asize # to count comparisons
+        samebox = 0
 
         ai = -1 # ai: archive index
         while ai < asize - 1:
@@ -252,6 +658,9 @@ class Archive(object):
             if nondominate:
                 continue # while
             if adominate: # candidate solution was dominated
+                if self.stats is not None:
+                    self.tally(ai + 1 + size0 - asize, size0 - asize, 0,
+                               False)
                 return
             if sdominate: # candidate solution dominated archive solution
                 self.remove(ai)
@@ -260,12 +669,16 @@ class Archive(object):
                 continue # while
 
             # solutions are in the same box
+            samebox = 1
             aobj = self.archive[ai]
             corner = [ebox[ii] * self.epsilons[ii] for ii in self.itobj]
             sdist = sum([(objectives[ii] - corner[ii]) **2
                          for ii in self.itobj])
             adist = sum([(aobj[ii] - corner[ii]) **2 for ii in self.itobj])
             if adist < sdist: # archive dominates
+                if self.stats is not None:
+                    self.tally(ai + 1 + size0 - asize, size0 - asize, 1,
+                               False)
                 return
             else: # solution dominates
                 self.remove(ai)
@@ -276,246 +689,2849 @@ class Archive(object):
 
         # if you get here, then no archive solution has dominated this one
         self.add(objectives, tagalong, ebox)
+        if self.stats is not None:
+            self.tally(size0, size0 - asize - samebox, samebox, True)
 
-class SortInputError(Exception):
-    """ Information about a defective input """
-    def __init__(self, msg, row, table):
-        super(SortInputError, self).__init__(msg)
-        self.row = row
-        self.table = table
-
-def noannotation(table):
-    """ produce solutions with no annotation from a table """
-    empty = []
-    for row in table:
-        yield (row, empty)
-
-def numbering(table, tag):
-    """
-    generator function 
-    annotate each row in the table with tag and line number
-    table: iterable, but probably a list of lists
-    tag: anything, but probably a string or an integer
+class BoxArchive(Archive):
     """
-    linenumber = 0
-    for row in table:
-        yield (row, [tag, linenumber])
-        linenumber += 1
+    An archive of epsilon-nondominated solutions, indexed by epsilon box.
 
-def numbers():
-    """
-    generator function yielding the numbers 0, 1, 2...
-    (Is there an easier way to express this?)
+    Drop-in replacement for Archive that returns the same solutions in
+    the same order.  Members are kept in a dictionary keyed on their
+    epsilon box, so a same-box tie is resolved with one lookup.  With
+    two objectives the boxes are also kept in lexicographic order, along
+    which the second coordinates decrease, so finding a dominating box or
+    the dominated ones is a binary search.  Otherwise the boxes are kept
+    in slabs, one for each first coordinate, see sortinto_slabs.
     """
-    ii = 0
-    while True:
-        yield ii
-        ii += 1
+    def __init__(self, epsilons):
+        """
+        epsilons: sizes of epsilon boxes to use in the sort.  Number
+                  of objectives is inferred by the number of epsilons.
+        """
+        self.members = OrderedDict() # box -> (objectives, tagalong)
+        self.sortedboxes = []        # boxes in lexicographic order
+        self.firsts = []             # first coordinates of slabs, in order
+        self.slabs = {}              # first coordinate -> (keys, rests)
+        self.epsilons = epsilons
+        self.itobj = range(len(epsilons)) # infer number of objectives
+        self.journal = None          # see Archive.sortinto_many
+        self.stats = None            # see Archive.stats
+        self.sources = None          # see Archive.sources
 
-def as_table(table):
-    """
-    try to convert a single table to something row-iterable
-    if it's a generator, assume it's ok
-    table: something tabular
-    """
-    try: # is it a Pandas DataFrame?
-        mat = table.as_matrix()
-    except AttributeError:
-        mat = table
+    def __len__(self):
+        return len(self.members)
 
-    try: # is it a double-subscriptable NumPy ndarray?
-        mat.tolist
-        mat[0].tolist
-        mat[0][0]
-        rowit = (x.tolist() for x in mat)
-    except (AttributeError, IndexError): 
-        rowit = table
+    @property
+    def archive(self):
+        """ objectives of archive members, in order of insertion """
+        return [member[0] for member in self.members.values()]
 
-    try: # is it a generator?
-        rowit.send
-        rowit.close
-        return rowit
-    except AttributeError:
-        pass
+    @property
+    def tagalongs(self):
+        """ tag-along data of archive members, in order of insertion """
+        return [member[1] for member in self.members.values()]
 
-    try: # is it double-subscriptable and not strings?
-        rowit[0][0]
-        try:
-            rowit[0].capitalize
-            raise TypeError()
-        except AttributeError:
-            # copy the data as needed
-            return ([v for v in r] for r in rowit)
-    except (AttributeError, IndexError):
-        raise TypeError()
+    @property
+    def boxes(self):
+        """ epsilon boxes of archive members, in order of insertion """
+        return [list(box) for box in self.members]
 
-    raise TypeError()
+    def add(self, objectives, tagalong, ebox):
+        """ add a solution to the archive, plus auxiliary information """
+        self.admit(objectives, tagalong, ebox)
+        if len(ebox) == 2:
+            bisect.insort(self.sortedboxes, ebox)
+            return
+        slab = self.slabs.get(ebox[0])
+        if slab is None:
+            slab = self.slabs[ebox[0]] = ([], [])
+            bisect.insort(self.firsts, ebox[0])
+        keys, rests = slab
+        rest = ebox[1:]
+        ii = bisect.bisect_left(rests, rest)
+        keys.insert(ii, rest[0] if rest else 0)
+        rests.insert(ii, rest)
 
-def as_tables(tables):
-    """
-    generator function yielding each table as something row-iterable
-    """
-    msg = "Failed to make input {0} row-iterable"
-    ii = 0
+    def remove(self, ebox):
+        """ remove the solution in ebox from the archive """
+        self.evict(ebox)
+        if len(ebox) == 2:
+            del self.sortedboxes[bisect.bisect_left(self.sortedboxes, ebox)]
+            return
+        keys, rests = self.slabs[ebox[0]]
+        ii = bisect.bisect_left(rests, ebox[1:])
+        del keys[ii]
+        del rests[ii]
+        if not keys:
+            del self.slabs[ebox[0]]
+            del self.firsts[bisect.bisect_left(self.firsts, ebox[0])]
 
-    # process a list of tables
-    for table in tables:
-        try:
-            tab = as_table(table)
-        except TypeError:
-            raise TypeError(msg.format(ii))
-        
-        yield tab
-        ii += 1
+    def admit(self, objectives, tagalong, ebox):
+        """ add a solution to members, leaving sortedboxes alone """
+        self.members[ebox] = (objectives, tagalong)
+        if self.journal is not None:
+            self.journal.append((True, id(objectives), objectives, tagalong))
+        if self.sources is not None:
+            self.sources.add(id(objectives))
 
-def flag_nondominated(tables, objectives=None, epsilons=None, **kwargs):
-    """
-    wrapper to eps_sort that returns a list of lists indicating which
-    rows from each table were nondominated
-    This function will fail if you can't call len() on each table.
+    def evict(self, ebox):
+        """ remove the solution in ebox from members only """
+        objectives, tagalong = self.members.pop(ebox)
+        if self.journal is not None:
+            self.journal.append((False, id(objectives), objectives, tagalong))
+        if self.sources is not None:
+            self.sources.remove(id(objectives))
 
-    tables: input data, must be iterable
-            each table can be a DataFrame, an ndarray, a list of lists.
-            A single table is also an acceptable input.
-    objectives: list of column indices in which objectives can be found,
-                if None default to all columns
-    epsilons: list of epsilons for the sort, if None default to 1e-9
+    def snapshot(self):
+        """
+        return the current front as a list of (objectives, tagalong)
+        tuples, in archive order
+        """
+        return list(self.members.values())
 
-    Keyword arguments:
-    *maximize*      columns to maximize
-    *maximize_all*  maximize all columns
-    """
-    kwargs.update({"attribution": True})
+    def sortinto(self, objectives, tagalong=None):
+        """
+        Sort a solution into the archive.  Add it if it's nondominated
+        w.r.t current solutions.
 
-    singletable = False
-    try:
-        sorttables = [x for x in as_tables(tables)]
-    except TypeError:
-        sorttables = [x for x in as_tables([tables])]
-        singletable = True
+        objectives: objectives by which to sort.  Minimization is assumed.
+        tagalong:   data to preserve with the objectives.  See
+                    Archive.sortinto.
+        """
+        ebox = tuple([math.floor(objectives[ii] / self.epsilons[ii])
+                      for ii in self.itobj])
 
-    tagalongs = eps_sort(sorttables, objectives, epsilons, **kwargs)
+        # Archive members are mutually nondominated, so if one of them
+        # shares the candidate's box, no other member can dominate the
+        # candidate or be dominated by it.
+        incumbent = self.members.get(ebox)
+        if incumbent is not None:
+            aobj = incumbent[0]
+            corner = [ebox[ii] * self.epsilons[ii] for ii in self.itobj]
+            sdist = sum([(objectives[ii] - corner[ii]) **2
+                         for ii in self.itobj])
+            adist = sum([(aobj[ii] - corner[ii]) **2 for ii in self.itobj])
+            if adist < sdist: # archive dominates
+                if self.stats is not None:
+                    self.tally(1, 0, 1, False)
+                return
+            # solution dominates: it goes to the back, as it would in
+            # Archive, but its box keeps its place in sortedboxes
+            self.evict(ebox)
+            self.admit(objectives, tagalong, ebox)
+            if self.stats is not None:
+                self.tally(1, 0, 1, True)
+            return
 
-    masks = []
-    if singletable is True:
-        tables = [tables]
-    gaps = []
-    lasts = []
-    numbers = []
-    for table in tables:
-        masks.append(list())
-        gaps.append(0)
-        lasts.append(-1)
-        numbers.append(-1)
-    for row in tagalongs:
-        tab = row[-2]
-        numbers[tab] = row[-1]
-        gaps[tab] = numbers[tab] - lasts[tab] - 1
-        lasts[tab] = numbers[tab]
-        masks[tab].extend([False] * gaps[tab])
-        masks[tab].append(True)
-    for tab in range(len(tables)):
-        gaps[tab] = len(tables[tab]) - numbers[tab] - 1
-        masks[tab].extend([False] * gaps[tab])
+        if len(ebox) != 2:
+            self.sortinto_slabs(objectives, tagalong, ebox)
+            return
 
-    if singletable is True:
-        masks = masks[0]
+        # Only boxes sorting before ebox can dominate it, and only boxes
+        # sorting after it can be dominated by it.  The first coordinates
+        # increase and the second coordinates decrease along sortedboxes,
+        # so the best candidate for a dominator is the one just before the
+        # split, and the dominated boxes are a run starting at the split.
+        sortedboxes = self.sortedboxes
+        split = bisect.bisect_left(sortedboxes, ebox)
+        if split > 0 and sortedboxes[split - 1][1] <= ebox[1]:
+            if self.stats is not None:
+                self.tally(1, 0, 0, False)
+            return
+        stop = split
+        while stop < len(sortedboxes) and sortedboxes[stop][1] >= ebox[1]:
+            self.evict(sortedboxes[stop])
+            stop += 1
+        dominates = stop - split
+        comparisons = (split > 0) + dominates + (stop < len(sortedboxes))
+        sortedboxes[split:stop] = [ebox]
 
-    return masks
+        self.admit(objectives, tagalong, ebox)
+        if self.stats is not None:
+            self.tally(comparisons, dominates, 0, True)
 
-def eps_sort(tables, objectives=None, epsilons=None, **kwargs):
+    def sortinto_slabs(self, objectives, tagalong, ebox):
+        """
+        sortinto for other than two objectives, once a same-box tie has
+        been ruled out.
+
+        Boxes are kept in slabs by their first coordinate.  Each slab
+        holds the rest of its boxes (rests) in lexicographic order, with
+        their second coordinates (keys) alongside for bisection.  Only
+        slabs up to ebox's first coordinate can hold a dominating box, and
+        only their boxes with keys up to ebox's second coordinate; only
+        slabs from ebox's first coordinate on can hold dominated boxes,
+        and only their boxes with keys from ebox's second coordinate on.
+
+        The boxes in a slab are mutually nondominated in their other
+        coordinates, so with three objectives each slab is a staircase:
+        the third coordinates decrease along it, and both questions are a
+        binary search.
+        """
+        first = ebox[0]
+        rest = ebox[1:]
+        key = rest[0] if rest else 0 # a single objective has no rest
+        exact = len(ebox) == 3
+        slabs = self.slabs
+        firsts = self.firsts
+        comparisons = 0
+
+        for abox0 in firsts[:bisect.bisect_right(firsts, first)]:
+            keys, rests = slabs[abox0]
+            stop = bisect.bisect_right(keys, key)
+            if exact:
+                comparisons += 1
+                if stop > 0 and rests[stop - 1][1] <= ebox[2]:
+                    if self.stats is not None:
+                        self.tally(comparisons, 0, 0, False)
+                    return
+                continue
+            for ai in range(stop):
+                comparisons += 1
+                arest = rests[ai]
+                for oo in range(1, len(rest)):
+                    if arest[oo] > rest[oo]:
+                        break # for oo
+                else: # candidate solution was dominated
+                    if self.stats is not None:
+                        self.tally(comparisons, 0, 0, False)
+                    return
+
+        dominates = 0
+        for abox0 in firsts[bisect.bisect_left(firsts, first):]:
+            keys, rests = slabs[abox0]
+            start = bisect.bisect_left(keys, key)
+            if exact:
+                stop = start
+                while stop < len(keys) and rests[stop][1] >= ebox[2]:
+                    stop += 1
+                comparisons += stop - start + (stop < len(keys))
+                losers = rests[start:stop]
+            else:
+                comparisons += len(keys) - start
+                losers = []
+                for arest in rests[start:]:
+                    for oo in range(1, len(rest)):
+                        if arest[oo] < rest[oo]:
+                            break # for oo
+                    else: # candidate solution dominated archive solution
+                        losers.append(arest)
+            for arest in losers:
+                self.remove((abox0,) + arest)
+            dominates += len(losers)
+
+        self.add(objectives, tagalong, ebox)
+        if self.stats is not None:
+            self.tally(comparisons, dominates, 0, True)
+
+class CompactArchive(Archive):
     """
-    return epsilon-nondominated solutions
+    An archive of epsilon-nondominated solutions that keeps objectives
+    and boxes in flat arrays of doubles instead of lists of lists.
 
-    tables: input data, must be iterable
-            each table can be a DataFrame, an ndarray, a list of lists.
-            A single table is also an acceptable input.
-    objectives: list of column indices in which objectives can be found,
-                if None default to all columns
-    epsilons: list of epsilons for the sort, if None default to 1e-9
+    Removing a member marks its slot dead instead of shifting every
+    later member down, and dead slots are squeezed out once they
+    outnumber the live ones, so members stay in the same order as in an
+    Archive.  Box numbers are whole-valued doubles, which represent every
+    box that math.floor can produce from a double exactly.
 
-    Keyword arguments:
-    *maximize*      columns to maximize
-    *maximize_all*  maximize all columns
-    *attribution*   True: add table number, row number to rows
+    If the tagalongs are references (for example, row numbers) rather
+    than rows, pass refs to keep them in an array of integers as well,
+    so that a member costs a few dozen bytes rather than a few hundred.
 
-    Duplicates some of cli() for a programmatic interface
+    If Numba is installed, candidates are compared with the boxes of a
+    large archive by box_scan compiled to machine code, see get_kernel.
+    Otherwise, if NumPy is installed, a candidate is compared with all
+    the boxes in a large archive at once.
     """
-    try:
-        tables = [x for x in as_tables(tables)]
-    except TypeError:
-        tables = [x for x in as_tables([tables])]
+    vectorsize = 64 # smallest archive to compare with NumPy
 
-    attribution = kwargs.get("attribution")
+    def __init__(self, epsilons, refs=0):
+        """
+        epsilons: sizes of epsilon boxes to use in the sort.  Number
+                  of objectives is inferred by the number of epsilons.
+        refs:     0 to keep tagalongs as they are, or the number of
+                  integers in each tagalong to keep them in an array.
+                  With refs=1 each tagalong is an integer, with more
+                  it is a tuple of integers.
+        """
+        self.epsilons = epsilons
+        self.nobj = len(epsilons)
+        self.itobj = range(len(epsilons)) # infer number of objectives
+        self.refs = refs
+        self.objarray = array("d")    # objectives, nobj per slot
+        self.boxarray = array("d")    # boxes, nobj per slot
+        if refs > 0:
+            self.refarray = array("q")    # refs per slot
+        else:
+            self.refarray = []            # one tagalong per slot
+        self.alive = bytearray()      # 1 for live slots, 0 for dead
+        self.ndead = 0
+        self.journal = None           # see Archive.sortinto_many
+        self.stats = None             # see Archive.stats
+        self.sources = None           # see Archive.sources, keyed by slot
+        self.numpy = get_numpy()
+        self.kernel = "auto"          # see get_kernel, None to do without
 
-    if attribution is True:
-        tables = [numbering(table, ii) for table, ii in zip(tables, numbers())]
-    else:
-        tables = [noannotation(table) for table in tables]
+    def __len__(self):
+        return len(self.alive) - self.ndead
 
-    tables = [withobjectives(annotatedrows, objectives)
-              for annotatedrows in tables]
+    def live(self):
+        """ indices of live slots, in archive order """
+        return [slot for slot, isalive in enumerate(self.alive) if isalive]
 
-    tomaximize = kwargs.get("maximize", None)
-    maximize_all = kwargs.get("maximize_all", False)
+    def objectives(self, slot):
+        """ objectives of the solution in slot """
+        return self.objarray[slot * self.nobj:(slot + 1) * self.nobj].tolist()
 
-    if tomaximize is not None or maximize_all:
-        if objectives is None:
-            mindices = tomaximize
-        elif maximize_all:
-            mindices = None
-        else:
-            mindices = [objectives.index(i) for i in tomaximize]
-        tables = [maximize(solutions, mindices) for solutions in tables]
+    def tagalong(self, slot):
+        """ tag-along data of the solution in slot """
+        if self.refs > 1:
+            return tuple(self.refarray[slot * self.refs:
+                                       (slot + 1) * self.refs])
+        return self.refarray[slot]
 
-    # tagalongs is the *raw* data
-    tagalongs = eps_sort_solutions(tables, epsilons)
+    @property
+    def archive(self):
+        """ objectives of archive members, in order of insertion """
+        return [self.objectives(slot) for slot in self.live()]
 
-    return tagalongs
+    @property
+    def tagalongs(self):
+        """ tag-along data of archive members, in order of insertion """
+        return [self.tagalong(slot) for slot in self.live()]
 
-def eps_sort_solutions(tables, epsilons=None):
-    """
-    Perform an epsilon-nondominated sort
-    tables: input (objectives, row) tuples
-    epsilons: epsilon values for the objectives.  Assume 1e-9 if none
-    """
-    # slip the first row off the first table to figure out nobj
-    objectives, row = next(tables[0])
-    table = [(objectives, row)]
-    tables = [table] + tables
+    @property
+    def boxes(self):
+        """ epsilon boxes of archive members, in order of insertion """
+        nobj = self.nobj
+        return [[int(b) for b in self.boxarray[slot * nobj:(slot + 1) * nobj]]
+                for slot in self.live()]
 
-    nobj = len(objectives)
-    if epsilons is None:
-        epsilons = [1e-9] * len(objectives)
-    elif len(epsilons) != nobj:
-        msg = "{0} epsilons, but {1} objectives".format(len(epsilons), nobj)
-        raise SortParameterError(msg)
+    def snapshot(self):
+        """
+        return the current front as a list of (objectives, tagalong)
+        tuples, in archive order
+        """
+        return [(self.objectives(slot), self.tagalong(slot))
+                for slot in self.live()]
 
-    archive = Archive(epsilons)
+    def add(self, objectives, tagalong, ebox):
+        """ add a solution to the archive, plus auxiliary information """
+        if self.journal is not None:
+            self.journal.append((True, len(self.alive), objectives, tagalong))
+        if self.sources is not None:
+            self.sources.add(len(self.alive))
+        self.objarray.extend(objectives)
+        self.boxarray.extend(ebox)
+        if self.refs > 1:
+            self.refarray.extend(tagalong)
+        else:
+            self.refarray.append(tagalong)
+        self.alive.append(1)
 
-    for table in tables:
-        for objectives, row in table:
-            archive.sortinto(objectives, row)
+    def remove(self, slot):
+        """ remove the solution in slot from the archive """
+        if self.journal is not None:
+            self.journal.append((False, slot, self.objectives(slot),
+                                 self.tagalong(slot)))
+        if self.sources is not None:
+            self.sources.remove(slot)
+        self.alive[slot] = 0
+        self.ndead += 1
 
-    return archive.tagalongs
+    def compact(self):
+        """ squeeze dead slots out of the arrays """
+        nobj = self.nobj
+        width = max(1, self.refs)
+        objarray = array("d")
+        boxarray = array("d")
+        refarray = array("q") if self.refs > 0 else []
+        if self.sources is not None:
+            self.sources.rekey(dict((slot, new) for new, slot in
+                                    enumerate(self.live())))
+        for slot in self.live():
+            objarray.extend(self.objarray[slot * nobj:(slot + 1) * nobj])
+            boxarray.extend(self.boxarray[slot * nobj:(slot + 1) * nobj])
+            refarray.extend(self.refarray[slot * width:(slot + 1) * width])
+        self.objarray = objarray
+        self.boxarray = boxarray
+        self.refarray = refarray
+        self.alive = bytearray([1]) * len(self)
+        self.ndead = 0
 
-def attribution(stream, tag, number=False):
-    """
-    extract lines from stream and augment with tag
-    """
-    if number:
-        linenumber = 0
-        for line in stream:
-            linenumber += 1
-            line = line.strip()
-            yield (line, [tag, str(linenumber)])
-    else:
-        for line in stream:
-            line = line.strip()
-            yield (line, [tag])
+    def vectorscan(self, ebox):
+        """
+        Compare ebox with every live box at once, using NumPy.
+        Archive members are mutually nondominated, so at most one of these
+        can happen: the candidate is dominated, it shares a box with a
+        member, or it dominates some members.
+        Return (dominated, slot of same-box member or None,
+        slots of dominated members)
+        """
+        np = self.numpy
+        # These are views on the arrays, which can't grow while they
+        # exist, so they must not outlive this method.
+        boxes = np.frombuffer(self.boxarray).reshape(-1, self.nobj)
+        alive = np.frombuffer(self.alive, dtype=np.uint8) != 0
+        ebox = np.array(ebox)
+        below = (boxes <= ebox).all(axis=1) & alive
+        above = (boxes >= ebox).all(axis=1) & alive
+        if (below > above).any():
+            return True, None, []
+        same = (below & above).nonzero()[0]
+        if len(same) > 0:
+            return False, int(same[0]), []
+        return False, None, above.nonzero()[0].tolist()
 
-def noattribution(stream):
-    """
+    def kernelscan(self, ebox, objectives):
+        """
+        Compare a candidate with every live member with the compiled
+        box_scan.
+        Return (rejected, slots of members it beat, samebox, comparisons),
+        see box_scan.
+        """
+        np = self.numpy
+        # views on the arrays, which can't grow while they exist
+        boxes = np.frombuffer(self.boxarray).reshape(-1, self.nobj)
+        objs = np.frombuffer(self.objarray).reshape(-1, self.nobj)
+        alive = np.frombuffer(self.alive, dtype=np.uint8)
+        corner = [ebox[ii] * self.epsilons[ii] for ii in self.itobj]
+        beaten = np.empty(len(alive), dtype=np.int64)
+        rejected, count, samebox, comparisons = self.kernel(
+            boxes, objs, alive, np.array(ebox), np.array(objectives, float),
+            np.array(corner), beaten)
+        return rejected, beaten[:count].tolist(), samebox, comparisons
+
+    def sortinto(self, objectives, tagalong=None):
+        """
+        Sort a solution into the archive.  Add it if it's nondominated
+        w.r.t current solutions.  See Archive.sortinto.
+        """
+        # float boxes, because comparing floats to ints is slow
+        ebox = [float(math.floor(objectives[ii] / self.epsilons[ii]))
+                for ii in self.itobj]
+
+        if self.kernel == "auto" and len(self.alive) >= self.vectorsize:
+            self.kernel = get_kernel() # not before it's worth importing
+        if self.kernel not in (None, "auto"):
+            rejected, slots, samebox, comparisons = self.kernelscan(
+                ebox, objectives)
+            if rejected:
+                if self.stats is not None:
+                    self.tally(comparisons, 0, samebox, False)
+                return
+            for slot in slots:
+                self.remove(slot)
+            self.add(objectives, tagalong, ebox)
+            if self.stats is not None:
+                self.tally(comparisons, len(slots) - samebox, samebox, True)
+            if self.ndead > max(len(self), 64) and self.journal is None:
+                self.compact()
+            return
+
+        if self.numpy is not None and len(self.alive) >= self.vectorsize:
+            size0 = len(self)
+            dominated, sameslot, slots = self.vectorscan(ebox)
+            if dominated:
+                if self.stats is not None:
+                    self.tally(size0, 0, 0, False)
+                return
+            if sameslot is not None:
+                corner = [ebox[ii] * self.epsilons[ii] for ii in self.itobj]
+                sdist = sum([(objectives[ii] - corner[ii]) **2
+                             for ii in self.itobj])
+                aobj = self.objectives(sameslot)
+                adist = sum([(aobj[ii] - corner[ii]) **2
+                             for ii in self.itobj])
+                if adist < sdist: # archive dominates
+                    if self.stats is not None:
+                        self.tally(size0, 0, 1, False)
+                    return
+                slots = [sameslot]
+            for slot in slots:
+                self.remove(slot)
+            self.add(objectives, tagalong, ebox)
+            if self.stats is not None:
+                samebox = 0 if sameslot is None else 1
+                self.tally(size0, len(slots) - samebox, samebox, True)
+            if self.ndead > max(len(self), 64) and self.journal is None:
+                self.compact()
+            return
+
+        # walk the live slots, taking their boxes nobj values at a time
+        nobj = self.nobj
+        size0 = len(self) # to count comparisons
+        ndead0 = self.ndead
+        samebox = 0
+        aboxes = zip(*[iter(self.boxarray)] * nobj)
+        for slot, isalive, abox in zip(numbers(), self.alive, aboxes):
+            if not isalive:
+                continue
+            adominate = False # archive dominates
+            sdominate = False # solution dominates
+            nondominate = False # neither dominates
+
+            for oo in self.itobj:
+                if abox[oo] < ebox[oo]:
+                    adominate = True
+                    if sdominate: # nondomination
+                        nondominate = True
+                        break # for
+                elif abox[oo] > ebox[oo]:
+                    sdominate = True
+                    if adominate: # nondomination
+                        nondominate = True
+                        break # for
+
+            if nondominate:
+                continue # for slot
+            if adominate: # candidate solution was dominated
+                if self.stats is not None:
+                    evicted = self.ndead - ndead0
+                    self.tally(self.alive.count(b"\x01", 0, slot + 1)
+                               + evicted, evicted, 0, False)
+                return
+            if sdominate: # candidate solution dominated archive solution
+                self.remove(slot)
+                continue # for slot
+
+            # solutions are in the same box
+            samebox = 1
+            aobj = self.objarray[slot * nobj:(slot + 1) * nobj]
+            corner = [ebox[ii] * self.epsilons[ii] for ii in self.itobj]
+            sdist = sum([(objectives[ii] - corner[ii]) **2
+                         for ii in self.itobj])
+            adist = sum([(aobj[ii] - corner[ii]) **2 for ii in self.itobj])
+            if adist < sdist: # archive dominates
+                if self.stats is not None:
+                    evicted = self.ndead - ndead0
+                    self.tally(self.alive.count(b"\x01", 0, slot + 1)
+                               + evicted, evicted, 1, False)
+                return
+            else: # solution dominates
+                self.remove(slot)
+
+        # if you get here, then no archive solution has dominated this one
+        self.add(objectives, tagalong, ebox)
+        if self.stats is not None:
+            self.tally(size0, self.ndead - ndead0 - samebox, samebox, True)
+
+        # slot numbers identify members in the journal, so leave them be
+        # while there is one
+        if self.ndead > max(len(self), 64) and self.journal is None:
+            self.compact()
+
+class WindowArchive(Archive):
+    """
+    An archive of the epsilon-nondominated solutions among the last so
+    many solutions sorted into it, or those sorted in the last so many
+    seconds, for following a running optimization.  The front is always
+    the one an Archive would hold if only the solutions in the window
+    had been sorted into it, in order.
+
+    Solutions leave the window in the order they arrived, so a solution
+    beaten by a later one (its box dominated, or its box won by it) can
+    never be on the front again and is dropped for good.  What is left
+    is in two layers: the front, and solutions beaten only by earlier
+    ones, which wait to come back.  Among the earlier solutions that
+    beat a waiting one, the last to arrive is always still in the
+    archive, so each waiting solution is filed under that one and comes
+    back onto the front as soon as it expires.  Expiring a solution is a
+    dictionary lookup; nothing is sorted again.
+
+    Every candidate is compared with both layers.  Comparisons are not
+    counted in stats.
+    """
+    def __init__(self, epsilons, rows=None, seconds=None):
+        """
+        epsilons: sizes of epsilon boxes to use in the sort.  Number
+                  of objectives is inferred by the number of epsilons.
+        rows:     number of solutions in the window, or None
+        seconds:  age in seconds at which solutions leave the window,
+                  or None
+        """
+        self.epsilons = epsilons
+        self.itobj = range(len(epsilons)) # infer number of objectives
+        self.rows = rows
+        self.seconds = seconds
+        self.members = OrderedDict() # arrival -> (box, corner distance,
+                                     #    objectives, tagalong, time,
+                                     #    source index or None)
+        self.front = set()           # arrivals of front members
+        self.waiting = {}            # arrival -> arrivals waiting on it
+        self.arrivals = 0            # number of solutions sorted so far
+        self.journal = None          # see Archive.sortinto_many
+        self.stats = None            # see Archive.stats
+        self.sources = None          # see Archive.sources, keyed by arrival
+
+    def __len__(self):
+        return len(self.front)
+
+    @property
+    def archive(self):
+        """ objectives of front members, in order of arrival """
+        return [objectives for objectives, _ in self.snapshot()]
+
+    @property
+    def tagalongs(self):
+        """ tag-along data of front members, in order of arrival """
+        return [tagalong for _, tagalong in self.snapshot()]
+
+    @property
+    def boxes(self):
+        """ epsilon boxes of front members, in order of arrival """
+        return [list(self.members[arrival][0])
+                for arrival in sorted(self.front)]
+
+    def add(self, arrival):
+        """ put a member on the front """
+        self.front.add(arrival)
+        objectives, tagalong, _, source = self.members[arrival][2:]
+        if self.journal is not None:
+            self.journal.append((True, id(objectives), objectives, tagalong))
+        if self.sources is not None:
+            self.sources.add(arrival, source)
+
+    def remove(self, arrival):
+        """ drop a member from the archive, and from the front if it's on it """
+        objectives, tagalong = self.members.pop(arrival)[2:4]
+        if arrival in self.front:
+            self.front.remove(arrival)
+            if self.journal is not None:
+                self.journal.append((False, id(objectives), objectives,
+                                     tagalong))
+            if self.sources is not None:
+                self.sources.remove(arrival)
+
+    def snapshot(self):
+        """
+        return the current front as a list of (objectives, tagalong)
+        tuples, in archive order
+        """
+        members = self.members
+        return [members[arrival][2:4] for arrival in sorted(self.front)]
+
+    def expire(self, now=None):
+        """
+        Remove solutions that have left the window, and bring back onto
+        the front those that were waiting on them.
+
+        now: the time, default to time.time(), for a window in seconds
+        """
+        members = self.members
+        oldest = None
+        if self.rows is not None:
+            oldest = self.arrivals - self.rows
+        while len(members) > 0:
+            arrival = next(iter(members))
+            if oldest is None or arrival >= oldest:
+                if self.seconds is None:
+                    break
+                if now is None:
+                    now = time.time()
+                if members[arrival][4] > now - self.seconds:
+                    break
+            self.remove(arrival)
+            for waiter in self.waiting.pop(arrival, ()):
+                if waiter in members: # not beaten since
+                    self.add(waiter)
+
+    def sortinto(self, objectives, tagalong=None, now=None):
+        """
+        Sort a solution into the window, and expire whatever it pushes
+        out of it.
+
+        objectives: objectives by which to sort.  Minimization is assumed.
+        tagalong:   data to preserve with the objectives.  See
+                    Archive.sortinto.
+        now:        arrival time, default to time.time(), for a window in
+                    seconds
+        """
+        if self.seconds is not None and now is None:
+            now = time.time()
+        ebox = tuple([math.floor(objectives[ii] / self.epsilons[ii])
+                      for ii in self.itobj])
+        corner = [ebox[ii] * self.epsilons[ii] for ii in self.itobj]
+        sdist = sum([(objectives[ii] - corner[ii]) **2 for ii in self.itobj])
+
+        beaten = []    # members the candidate beats
+        dominator = None # last member to arrive that beats the candidate
+        for arrival, member in self.members.items():
+            abox = member[0]
+            adominate = False
+            sdominate = False
+            for oo in self.itobj:
+                if abox[oo] < ebox[oo]:
+                    adominate = True
+                    if sdominate:
+                        break
+                elif abox[oo] > ebox[oo]:
+                    sdominate = True
+                    if adominate:
+                        break
+            else:
+                if adominate: # member's box dominates
+                    dominator = arrival
+                elif sdominate: # candidate's box dominates
+                    beaten.append(arrival)
+                elif member[1] < sdist: # same box, member is closer
+                    dominator = arrival
+                else: # same box, candidate is closer or later
+                    beaten.append(arrival)
+
+        for arrival in beaten:
+            self.remove(arrival)
+            self.waiting.pop(arrival, None)
+        # whatever waited on a beaten member is beaten too, so it's gone
+        arrival = self.arrivals
+        self.arrivals += 1
+        source = None if self.sources is None else self.sources.source
+        self.members[arrival] = (ebox, sdist, objectives, tagalong, now,
+                                 source)
+        if dominator is None:
+            self.add(arrival)
+        else:
+            self.waiting.setdefault(dominator, []).append(arrival)
+        self.expire(now)
+
+def box_scan(boxes, objs, alive, ebox, objectives, corner, beaten):
+    """
+    The comparisons of CompactArchive.sortinto, in a form that Numba can
+    compile, see get_kernel.  It runs as plain Python too, slowly.
+
+    boxes, objs: boxes and objectives of the archive slots, 2-d float
+                 ndarrays with one row per slot
+    alive: uint8 ndarray, 1 for live slots
+    ebox, objectives, corner: the candidate's box, objectives and box
+                              corner, float ndarrays
+    beaten: int64 ndarray at least as long as alive, for the slots of
+            the members the candidate beats
+    Return (rejected, count, samebox, comparisons): rejected is 1 if a
+    member's box dominates the candidate's, or a member in its box is
+    closer to the corner, in which case the beaten slots don't matter.
+    Otherwise the candidate beats the members in beaten[:count].
+    samebox is 1 if a member shared its box.  Distances are summed in
+    the same order as in Archive.sortinto, so ties break the same way.
+    """
+    nslot, nobj = boxes.shape
+    sdist = 0.0
+    for oo in range(nobj):
+        diff = objectives[oo] - corner[oo]
+        sdist += diff * diff
+    count = 0
+    samebox = 0
+    comparisons = 0
+    for slot in range(nslot):
+        if alive[slot] == 0:
+            continue
+        comparisons += 1
+        adominate = False # archive dominates
+        sdominate = False # solution dominates
+        nondominate = False # neither dominates
+        for oo in range(nobj):
+            if boxes[slot, oo] < ebox[oo]:
+                adominate = True
+                if sdominate:
+                    nondominate = True
+                    break
+            elif boxes[slot, oo] > ebox[oo]:
+                sdominate = True
+                if adominate:
+                    nondominate = True
+                    break
+        if nondominate:
+            continue
+        if adominate:
+            return 1, count, 0, comparisons
+        if not sdominate: # same box
+            samebox = 1
+            adist = 0.0
+            for oo in range(nobj):
+                diff = objs[slot, oo] - corner[oo]
+                adist += diff * diff
+            if adist < sdist:
+                return 1, count, 1, comparisons
+        beaten[count] = slot
+        count += 1
+    return 0, count, samebox, comparisons
+
+KERNELS = {} # compiled functions, see get_kernel
+
+def get_kernel():
+    """
+    box_scan compiled by Numba, or None if Numba (or NumPy) is not
+    installed.  It is compiled the first time it's needed in each
+    process, or loaded from Numba's cache if a previous process left
+    one there.
+    """
+    if "box_scan" not in KERNELS:
+        try:
+            import numba
+        except ImportError:
+            KERNELS["box_scan"] = None
+        else:
+            KERNELS["box_scan"] = numba.njit(cache=True)(box_scan)
+    return KERNELS["box_scan"]
+
+ARCHIVES = {
+    "box": BoxArchive,
+    "compact": CompactArchive,
+    "list": Archive,
+}
+
+def box_winners(solutions, epsilons):
+    """
+    Reduce solutions to the one that would win each epsilon box in an
+    Archive: the solution closest to the box corner, or among equally
+    close solutions, the last one.
+
+    solutions: iterable of (objectives, tagalong) tuples
+    epsilons: sizes of epsilon boxes
+    Return a dictionary mapping box tuples to
+    (corner distance, arrival number, objectives, tagalong).
+    """
+    itobj = range(len(epsilons))
+    winners = {}
+    arrival = 0
+    for objectives, tagalong in solutions:
+        ebox = tuple([math.floor(objectives[ii] / epsilons[ii])
+                      for ii in itobj])
+        corner = [ebox[ii] * epsilons[ii] for ii in itobj]
+        sdist = sum([(objectives[ii] - corner[ii]) **2 for ii in itobj])
+        incumbent = winners.get(ebox)
+        if incumbent is None or not incumbent[0] < sdist:
+            winners[ebox] = (sdist, arrival, objectives, tagalong)
+        arrival += 1
+    return winners
+
+def kung_front(boxes):
+    """
+    Kung's divide-and-conquer algorithm for the nondominated subset of
+    a list of distinct boxes in lexicographic order.  Returns the
+    nondominated boxes, still in lexicographic order.
+
+    A box can't be dominated by a box after it in lexicographic order,
+    so the front of the first half survives intact, and the front of the
+    second half only needs to be checked against it.  With two
+    objectives the second coordinates of the front must decrease, so a
+    single sweep does it.
+    """
+    if len(boxes) == 0:
+        return []
+    if len(boxes[0]) == 2:
+        front = []
+        best = None
+        for box in boxes:
+            if best is None or box[1] < best:
+                front.append(box)
+                best = box[1]
+        return front
+    if len(boxes) == 1:
+        return boxes
+
+    half = len(boxes) // 2
+    top = kung_front(boxes[:half])
+    bottom = kung_front(boxes[half:])
+    itobj = range(len(boxes[0]))
+    for box in bottom:
+        for tbox in top:
+            for oo in itobj:
+                if tbox[oo] > box[oo]:
+                    break # for oo, not dominated by tbox
+            else: # dominated
+                break # for tbox
+        else: # not dominated by any box in top
+            top.append(box)
+    return top
+
+def kung_sort(solutions, epsilons):
+    """
+    Epsilon-nondominated sort by Kung's algorithm.  Returns
+    (objectives, tagalong) tuples for the nondominated solutions, in the
+    same order as an Archive would hold them.
+
+    solutions: iterable of (objectives, tagalong) tuples
+    epsilons: sizes of epsilon boxes
+    """
+    winners = box_winners(solutions, epsilons)
+    front = kung_front(sorted(winners))
+    survivors = sorted([winners[box][1:] for box in front],
+                       key=lambda winner: winner[0])
+    return [(objectives, tagalong) for _, objectives, tagalong in survivors]
+
+def box_levels(boxes, sizes, cap=None):
+    """
+    Number of fronts that go by before the first solution in each box is
+    ranked, for box_ranks.
+
+    A box's solutions are ranked one per front, from the front after the
+    last one that holds a solution from a box dominating it, so this is
+    the longest path to each box through the boxes that dominate it,
+    where a box's length is its number of solutions.  Dominating boxes
+    sort before the boxes they dominate, so one pass in lexicographic
+    order does it: sweep_levels for two objectives, search_levels for
+    more.  One objective's boxes form a chain, each dominated by all
+    those before it, so its level is the number of solutions before
+    it.  With four or more objectives, fronts tend to be large and
+    few, so if NumPy is installed the large fronts are peeled off first
+    by peel_levels.
+
+    boxes: distinct boxes in lexicographic order
+    sizes: number of solutions in each box
+    cap:   if given, don't count past this many fronts
+    """
+    if len(boxes) == 0:
+        return []
+    if cap is None:
+        cap = sum(sizes)
+    if len(boxes[0]) == 1:
+        levels = []
+        before = 0
+        for size in sizes:
+            levels.append(before)
+            before = min(before + size, cap)
+        return levels
+    if len(boxes[0]) == 2:
+        return sweep_levels(boxes, sizes, cap)
+    if len(boxes[0]) > 3 and get_numpy() is not None:
+        return peel_levels(boxes, sizes, cap)
+    return search_levels(boxes, sizes, cap)
+
+def sweep_levels(boxes, sizes, cap):
+    """
+    box_levels for two objectives.  The boxes seen so far that dominate a
+    box are those with a smaller or equal second coordinate, and a
+    Fenwick tree over the second coordinates finds the longest path
+    among them in O(log N).
+    """
+    levels = []
+    seconds = sorted(set([box[1] for box in boxes]))
+    position = dict([(second, ii + 1) for ii, second in enumerate(seconds)])
+    tree = [0] * (len(seconds) + 1) # prefix maxima of last fronts
+    for box, size in zip(boxes, sizes):
+        before = 0
+        ii = position[box[1]]
+        while ii > 0:
+            if tree[ii] > before:
+                before = tree[ii]
+            ii -= ii & -ii
+        levels.append(before)
+        last = min(before + size, cap)
+        ii = position[box[1]]
+        while ii < len(tree):
+            if tree[ii] < last:
+                tree[ii] = last
+            ii += ii & -ii
+    return levels
+
+def search_levels(boxes, sizes, cap):
+    """
+    box_levels for three or more objectives.  The boxes seen so far are
+    listed under each front they have solutions in.  If a box is
+    dominated by a box in some front, it is dominated by a box in every
+    front before that one too (the dominating box was itself held back
+    by a box that dominates it), so a binary search over the fronts
+    finds the last one holding a dominating box, as in efficient
+    nondominated sorting (ENS-BS).
+
+    The boxes in a front are mutually nondominated, and each front also
+    keeps the staircase of their second and third coordinates, which
+    answers the question outright for three objectives and rules most
+    fronts out quickly for more.
+    """
+    levels = []
+    itobj = range(3, len(boxes[0])) # first coordinates are in order
+    exact = len(boxes[0]) == 3
+    fronts = [] # boxes with a solution in each front, up to cap
+    stairs = [] # (second coordinates, third coordinates) for each front
+    for box, size in zip(boxes, sizes):
+        low = 0 # fronts[:low] have a dominating box
+        high = len(fronts) # fronts[high:] don't
+        while low < high:
+            middle = (low + high) // 2
+            keys, values = stairs[middle]
+            ii = bisect.bisect_right(keys, box[1]) - 1
+            dominated = ii >= 0 and values[ii] <= box[2]
+            if dominated and not exact:
+                for dbox in fronts[middle]:
+                    if dbox[1] <= box[1] and dbox[2] <= box[2]:
+                        for oo in itobj:
+                            if dbox[oo] > box[oo]:
+                                break # for oo, dbox doesn't dominate
+                        else:
+                            break # for dbox, dominated
+                else:
+                    dominated = False
+            if dominated:
+                low = middle + 1
+            else:
+                high = middle
+        levels.append(low)
+
+        for front in range(low, min(low + size, cap)):
+            if front == len(fronts):
+                fronts.append([])
+                stairs.append(([], []))
+            fronts[front].append(box)
+            keys, values = stairs[front]
+            stop = bisect.bisect_right(keys, box[1])
+            if stop > 0 and values[stop - 1] <= box[2]:
+                continue # already on the staircase
+            start = bisect.bisect_left(keys, box[1])
+            while stop < len(keys) and values[stop] >= box[2]:
+                stop += 1
+            keys[start:stop] = [box[1]]
+            values[start:stop] = [box[2]]
+    return levels
+
+def peel_levels(boxes, sizes, cap, smallest=32):
+    """
+    box_levels with NumPy: find the front of the boxes that still hold
+    unranked solutions with front_boxes, take one solution from each box
+    on it, and repeat.  Once a front has fewer than smallest boxes, the
+    fronts are probably thin and many, so what's left, which is an
+    independent ranking problem with a box for each box still holding
+    solutions, goes to search_levels instead.
+    """
+    np = get_numpy()
+    matrix = np.array(boxes, dtype=float)
+    remaining = np.array(sizes)
+    levels = np.zeros(len(boxes), dtype=int) - 1
+    # in order of sums, as front_boxes wants them
+    occupied = np.argsort(matrix.sum(axis=1), kind="mergesort")
+    level = 0
+    while occupied.size > 0 and level < cap:
+        front = front_boxes(matrix, alive=occupied)
+        if len(front) < smallest:
+            break
+        levels[front[levels[front] < 0]] = level
+        remaining[front] -= 1
+        occupied = occupied[remaining[occupied] > 0]
+        level += 1
+
+    if occupied.size > 0 and level < cap:
+        occupied = np.sort(occupied) # back in lexicographic order
+        rest = search_levels([boxes[ii] for ii in occupied.tolist()],
+                             remaining[occupied].tolist(), cap - level)
+        rest = np.array(rest) + level
+        unranked = levels[occupied] < 0
+        levels[occupied[unranked]] = rest[unranked]
+    levels[levels < 0] = cap
+    return levels.tolist()
+
+def box_ranks(points, epsilons, ranks=None):
+    """
+    Epsilon-nondomination ranks.  Rank 1 is the front that eps_sort
+    finds, rank 2 is the front that eps_sort would find if the solutions
+    of rank 1 were taken out, and so on, but the solutions are sorted
+    only once: each box's solutions take consecutive ranks, best first
+    (closest to the box corner, then latest), from the rank that
+    box_levels works out.
+
+    points: objectives of each solution, minimized
+    epsilons: sizes of epsilon boxes
+    ranks: if given, rank only this many fronts
+    Return a list with the rank of each solution, or None for solutions
+    beyond the first ranks fronts.
+    """
+    itobj = range(len(epsilons))
+    members = {} # box -> [(corner distance, -index)]
+    for index, objectives in enumerate(points):
+        if len(objectives) != len(epsilons):
+            msg = "{0} epsilons, but {1} objectives".format(
+                len(epsilons), len(objectives))
+            raise SortParameterError(msg)
+        ebox = tuple([math.floor(objectives[ii] / epsilons[ii])
+                      for ii in itobj])
+        corner = [ebox[ii] * epsilons[ii] for ii in itobj]
+        sdist = sum([(objectives[ii] - corner[ii]) **2 for ii in itobj])
+        members.setdefault(ebox, []).append((sdist, -index))
+
+    boxes = sorted(members)
+    levels = box_levels(boxes, [len(members[box]) for box in boxes], ranks)
+    result = [None] * len(points)
+    for box, level in zip(boxes, levels):
+        for rank, (_, negindex) in enumerate(sorted(members[box]),
+                                             level + 1):
+            if ranks is not None and rank > ranks:
+                break
+            result[-negindex] = rank
+    return result
+
+ALGORITHMS = ("archive", "kung", "grid")
+
+class SortInputError(Exception):
+    """ Information about a defective input """
+    def __init__(self, msg, row, table):
+        super(SortInputError, self).__init__(msg)
+        self.row = row
+        self.table = table
+
+def noannotation(table):
+    """ produce solutions with no annotation from a table """
+    empty = []
+    for row in table:
+        yield (row, empty)
+
+def numbering(table, tag, linenumber=0):
+    """
+    generator function 
+    annotate each row in the table with tag and line number
+    table: iterable, but probably a list of lists
+    tag: anything, but probably a string or an integer
+    linenumber: number of the first row
+    """
+    for row in table:
+        yield (row, [tag, linenumber])
+        linenumber += 1
+
+def numbers():
+    """
+    generator function yielding the numbers 0, 1, 2...
+    (Is there an easier way to express this?)
+    """
+    ii = 0
+    while True:
+        yield ii
+        ii += 1
+
+def as_table(table):
+    """
+    try to convert a single table to something row-iterable
+    if it's a generator, assume it's ok
+    table: something tabular
+    """
+    try: # is it a Pandas DataFrame?
+        mat = table.as_matrix()
+    except AttributeError:
+        mat = table
+
+    try: # is it a double-subscriptable NumPy ndarray?
+        mat.tolist
+        mat[0].tolist
+        mat[0][0]
+        rowit = (x.tolist() for x in mat)
+    except (AttributeError, IndexError): 
+        rowit = table
+
+    try: # is it a generator?
+        rowit.send
+        rowit.close
+        return rowit
+    except AttributeError:
+        pass
+
+    try: # is it double-subscriptable and not strings?
+        rowit[0][0]
+        try:
+            rowit[0].capitalize
+            raise TypeError()
+        except AttributeError:
+            # copy the data as needed
+            return ([v for v in r] for r in rowit)
+    except (AttributeError, IndexError):
+        raise TypeError()
+
+    raise TypeError()
+
+def as_tables(tables):
+    """
+    generator function yielding each table as something row-iterable
+    """
+    msg = "Failed to make input {0} row-iterable"
+    ii = 0
+
+    # process a list of tables
+    for table in tables:
+        try:
+            tab = as_table(table)
+        except TypeError:
+            raise TypeError(msg.format(ii))
+        
+        yield tab
+        ii += 1
+
+def flag_nondominated(tables, objectives=None, epsilons=None, **kwargs):
+    """
+    wrapper to eps_sort that returns a list of lists indicating which
+    rows from each table were nondominated
+    This function will fail if you can't call len() on each table.
+
+    If the NumPy engine does the sort (see eps_sort), the flags come
+    back as boolean ndarrays instead of lists, and only the objective
+    columns of the tables are copied.
+
+    tables: input data, must be iterable
+            each table can be a DataFrame, an ndarray, a list of lists.
+            A single table is also an acceptable input.
+    objectives: list of column indices in which objectives can be found,
+                if None default to all columns
+    epsilons: list of epsilons for the sort, if None default to 1e-9
+
+    Keyword arguments:
+    *maximize*      columns to maximize
+    *maximize_all*  maximize all columns
+    *engine*        "auto", "numpy", or "python", see eps_sort
+    """
+    arrays = engine_arrays(tables, sort_engine(kwargs), True)
+    if arrays is not None:
+        if isinstance(arrays, list):
+            return array_masks(arrays, objectives, epsilons, **kwargs)
+        return array_masks([arrays], objectives, epsilons, **kwargs)[0]
+
+    kwargs.update({"attribution": True})
+
+    singletable = False
+    try:
+        sorttables = [x for x in as_tables(tables)]
+    except TypeError:
+        sorttables = [x for x in as_tables([tables])]
+        singletable = True
+
+    tagalongs = eps_sort(sorttables, objectives, epsilons, **kwargs)
+
+    if singletable is True:
+        tables = [tables]
+    masks = [[False] * len(table) for table in tables]
+    for row in tagalongs:
+        masks[row[-2]][row[-1]] = True
+
+    if singletable is True:
+        masks = masks[0]
+
+    return masks
+
+def eps_sort(tables, objectives=None, epsilons=None, **kwargs):
+    """
+    return epsilon-nondominated solutions
+
+    tables: input data, must be iterable
+            each table can be a DataFrame, an ndarray, a list of lists.
+            A single table is also an acceptable input.
+    objectives: list of column indices in which objectives can be found,
+                if None default to all columns
+    epsilons: list of epsilons for the sort, if None default to 1e-9
+
+    Keyword arguments:
+    *maximize*      columns to maximize
+    *maximize_all*  maximize all columns
+    *attribution*   True: add table number, row number to rows
+    *archive*       "box" (default), "compact" or "list", see ARCHIVES
+    *algorithm*     "archive" (default), "kung" or "grid", see
+                    eps_sort_solutions
+    *engine*        "auto" (default): use eps_sort_indices if every table
+                    is an ndarray or DataFrame and NumPy is installed,
+                    and none of archive, algorithm, presort or stats is
+                    given, since they only apply row by row.
+                    "numpy": always use eps_sort_indices, a TypeError
+                    with any of those four.
+                    "python": always sort row by row into an archive.
+    *presort*       None (default) sorts solutions into the archive as
+                    they come.  "sum" or "lex" holds them all in memory
+                    and sorts them in in order of their boxes, see
+                    presorted_front, so that few are evicted.  That pays
+                    off on adversarially ordered input, but is slower on
+                    input in random order.  Results are the same.
+    *stats*         a SortStats to count comparisons in, see
+                    eps_sort_solutions
+    *jobs*          number of worker processes, default 1.  Tables that
+                    are lists or tuples, or ndarrays and DataFrames for
+                    the NumPy engine, are split into shards that are
+                    sorted in parallel, and then the fronts of the shards
+                    are merged pairwise, also in parallel, see
+                    merge_tree.  Results are the same.  stats, if
+                    given, are summed over the workers, merges included.
+
+    Duplicates some of cli() for a programmatic interface
+    """
+    arrays = engine_arrays(tables, sort_engine(kwargs))
+    if arrays is not None:
+        if not isinstance(arrays, list):
+            arrays = [arrays]
+        masks = array_masks(arrays, objectives, epsilons, **kwargs)
+        attribution = kwargs.get("attribution")
+        tagalongs = []
+        for tab, mat, mask in zip(numbers(), arrays, masks):
+            for rownumber in mask.nonzero()[0].tolist():
+                row = mat[rownumber].tolist()
+                if attribution is True:
+                    row.extend([tab, rownumber])
+                tagalongs.append(row)
+        return tagalongs
+
+    try:
+        rowtables = [x for x in as_tables(tables)]
+    except TypeError:
+        rowtables = [x for x in as_tables([tables])]
+        tables = [tables]
+
+    archive = kwargs.get("archive", "box")
+    algorithm = kwargs.get("algorithm", "archive")
+    jobs = kwargs.get("jobs", 1)
+    if jobs > 1 and isinstance(tables, (list, tuple)) and \
+            all([isinstance(table, (list, tuple)) for table in tables]):
+        # shard the tables so there's enough work for every process
+        nshards = max(1, jobs // len(tables))
+        tasks = []
+        for tag, table in zip(numbers(), tables):
+            step = len(table) // nshards + 1
+            for start in range(0, len(table), step):
+                tasks.append((table[start:start + step], tag, start,
+                              objectives, epsilons, kwargs))
+        import multiprocessing
+        pool = multiprocessing.Pool(jobs)
+        stats = kwargs.get("stats")
+        try:
+            if stats is None:
+                fronts = pool.map(sort_shard, tasks, 1)
+                front = merge_tree(fronts, merge_pair, pool, epsilons,
+                                   archive, algorithm)
+            else:
+                fronts = pool.map(counted_shard, tasks, 1)
+                front, workerstats = merge_tree(fronts, counted_pair, pool,
+                                                epsilons, archive, algorithm)
+                stats.add(workerstats)
+        finally:
+            pool.close()
+            pool.join()
+        return [tagalong for _, tagalong in front]
+
+    tables = [table_solutions(table, ii, objectives, **kwargs)
+              for table, ii in zip(rowtables, numbers())]
+
+    # tagalongs is the *raw* data
+    tagalongs = eps_sort_solutions(tables, epsilons, archive, algorithm,
+                                   kwargs.get("stats"),
+                                   kwargs.get("presort"))
+
+    return tagalongs
+
+def eps_rank(tables, objectives=None, epsilons=None, **kwargs):
+    """
+    return the epsilon-nondomination rank of every row, as a list for a
+    single table or a list of lists for a list of tables, the way
+    flag_nondominated returns flags.  Rank 1 is the front that eps_sort
+    returns, rank 2 is the front of what is left, and so on, but each row
+    is sorted only once, see box_ranks.
+
+    tables, objectives, epsilons: see eps_sort
+
+    Keyword arguments:
+    *maximize*      columns to maximize
+    *maximize_all*  maximize all columns
+    *ranks*         rank only this many fronts, and give the rows in
+                    later fronts a rank of None
+    """
+    kwargs = dict(kwargs)
+    kwargs["attribution"] = False
+
+    singletable = False
+    try:
+        rowtables = [x for x in as_tables(tables)]
+    except TypeError:
+        rowtables = [x for x in as_tables([tables])]
+        singletable = True
+
+    points = []
+    lengths = []
+    for tag, table in zip(numbers(), rowtables):
+        before = len(points)
+        points.extend([objectives for objectives, _ in
+                       table_solutions(table, tag, objectives, **kwargs)])
+        lengths.append(len(points) - before)
+
+    if epsilons is None:
+        epsilons = [1e-9] * (len(points[0]) if len(points) > 0 else 0)
+    ranks = box_ranks(points, epsilons, kwargs.get("ranks"))
+
+    tableranks = []
+    start = 0
+    for length in lengths:
+        tableranks.append(ranks[start:start + length])
+        start += length
+
+    if singletable is True:
+        return tableranks[0]
+    return tableranks
+
+def eps_target(tables, target, objectives=None, epsilons=None, **kwargs):
+    """
+    return epsilon-nondominated solutions, as eps_sort does, with the
+    epsilons scaled so that there are at most about target of them, and
+    the epsilons that were used.  See target_front.
+
+    tables, objectives: see eps_sort
+    target: most solutions to return
+    epsilons: epsilons to scale, if None start from the range of each
+              objective
+    Keyword arguments are the same as for eps_sort, except for engine
+    and jobs, plus:
+    *steps*         most bisection steps, see target_front
+    Return (rows, epsilons).
+    """
+    try:
+        rowtables = [x for x in as_tables(tables)]
+    except TypeError:
+        rowtables = [x for x in as_tables([tables])]
+
+    solutions = [solution for tag, table in zip(numbers(), rowtables)
+                 for solution in table_solutions(table, tag, objectives,
+                                                 **kwargs)]
+    front, epsilons = target_front(solutions, target, epsilons,
+                                   kwargs.get("archive", "box"),
+                                   kwargs.get("algorithm", "archive"),
+                                   steps=kwargs.get("steps", 30))
+    return [tagalong for _, tagalong in front], epsilons
+
+def table_solutions(table, tag, objectives=None, linenumber=0, **kwargs):
+    """
+    generator of (objectives, row) tuples from one row-iterable table,
+    as eps_sort prepares them for the sort
+
+    table: row-iterable table, see as_table
+    tag: table number to use for attribution
+    objectives: list of column indices, if None use all columns
+    linenumber: row number of the first row, for attribution
+    Keyword arguments are the same as for eps_sort.
+    """
+    if kwargs.get("attribution") is True:
+        annotatedrows = numbering(table, tag, linenumber)
+    else:
+        annotatedrows = noannotation(table)
+
+    solutions = withobjectives(annotatedrows, objectives)
+
+    tomaximize = kwargs.get("maximize", None)
+    maximize_all = kwargs.get("maximize_all", False)
+
+    if tomaximize is not None or maximize_all:
+        if objectives is None:
+            mindices = tomaximize
+        elif maximize_all:
+            mindices = None
+        else:
+            mindices = [objectives.index(i) for i in tomaximize]
+        solutions = maximize(solutions, mindices)
+
+    return solutions
+
+def sort_shard(task, stats=None):
+    """
+    sort one shard of an in-memory table for eps_sort(jobs=...),
+    in a worker process.  Return the front as (objectives, row) tuples.
+    stats: a SortStats to count comparisons in
+    """
+    table, tag, linenumber, objectives, epsilons, kwargs = task
+    solutions = table_solutions(as_table(table), tag, objectives,
+                                linenumber, **kwargs)
+    return front_solutions([solutions], epsilons,
+                           kwargs.get("archive", "box"),
+                           kwargs.get("algorithm", "archive"), stats,
+                           presort=kwargs.get("presort"))
+
+def counted_shard(task):
+    """ sort_shard, returning the front and a SortStats for it """
+    stats = SortStats()
+    return sort_shard(task, stats), stats
+
+def parallel_map(function, tasks, jobs):
+    """
+    apply function to each task in a pool of jobs worker processes,
+    return the results in the order of the tasks
+    """
+    import multiprocessing
+    pool = multiprocessing.Pool(jobs)
+    try:
+        return pool.map(function, tasks, 1)
+    finally:
+        pool.close()
+        pool.join()
+
+def merge_tree(fronts, merge, pool, *extra):
+    """
+    Merge the fronts of consecutive shards pairwise, round by round, in
+    a pool of worker processes, so that there are about log2(len(fronts))
+    rounds instead of len(fronts) - 1 merges in a row.  Because each
+    merge is of neighbours, in order, the result is the same as merging
+    them all at once.
+
+    merge: function of a (first, second) + extra tuple that returns the
+           merged front, see merge_pair
+    pool: a multiprocessing.Pool
+    Return the merged front.
+    """
+    while len(fronts) > 1:
+        tasks = [(fronts[ii], fronts[ii + 1]) + extra
+                 for ii in range(0, len(fronts) - 1, 2)]
+        merged = pool.map(merge, tasks, 1)
+        if len(fronts) % 2 == 1:
+            merged.append(fronts[-1])
+        fronts = merged
+    return fronts[0]
+
+def merge_pair(task):
+    """
+    merge two fronts of (objectives, tagalong) tuples, for merge_tree in
+    a worker process
+    """
+    first, second, epsilons, archive, algorithm = task
+    return merge_fronts([first, second], epsilons, archive, algorithm)
+
+def counted_pair(task):
+    """
+    merge_pair for (front, SortStats) tuples from counted_shard, adding
+    the counts of the merge to those of both fronts
+    """
+    (first, firststats), (second, secondstats) = task[:2]
+    epsilons, archive, algorithm = task[2:]
+    stats = SortStats()
+    front = merge_fronts([first, second], epsilons, archive, algorithm,
+                         stats)
+    stats.add(firststats)
+    stats.add(secondstats)
+    return front, stats
+
+def merge_fronts(fronts, epsilons=None, archive="box", algorithm="archive",
+                 stats=None, sources=None, origins=None):
+    """
+    Sort the fronts of several shards together.  Epsilon-nondomination is
+    associative, so if the shards are consecutive pieces of the input,
+    given in order, the result is the same as sorting the whole input at
+    once.
+
+    fronts: lists of (objectives, tagalong) tuples
+    sources, origins: see front_solutions
+    Return the merged front as (objectives, tagalong) tuples.
+    """
+    return front_solutions([iter(front) for front in fronts], epsilons,
+                           archive, algorithm, stats, sources, origins)
+
+def eps_sort_solutions(tables, epsilons=None, archive="box",
+                       algorithm="archive", stats=None, presort=None):
+    """
+    Perform an epsilon-nondominated sort
+    tables: input (objectives, row) tuples
+    epsilons: epsilon values for the objectives.  Assume 1e-9 if none
+    archive: which kind of archive to sort into, a key of ARCHIVES, or
+             a function that takes the epsilons and returns an archive
+    algorithm: "archive" sorts solutions into the archive one at a time.
+               "kung" holds the best solution from each box in memory and
+               finds the nondominated boxes by Kung's algorithm, which is
+               much faster when the front is large.  "grid" also holds
+               the best solution from each box, found in one pass by
+               box_winners, and then sorts only those into the archive,
+               which saves comparisons when many solutions share boxes.
+               Results are the same.
+    stats: a SortStats to count comparisons in, for the archive algorithm
+    presort: None to sort solutions into the archive as they arrive, or
+             "sum" or "lex" to read them all into memory and sort them
+             in by box, which saves evicting members that are dominated
+             by later solutions, see presorted_front.  Only for the
+             archive algorithm.  Results are the same, but it only pays
+             off when the input is ordered worst first or close to it.
+    """
+    return [tagalong for _, tagalong in
+            front_solutions(tables, epsilons, archive, algorithm, stats,
+                            presort=presort)]
+
+def front_solutions(tables, epsilons=None, archive="box",
+                    algorithm="archive", stats=None, sources=None,
+                    origins=None, presort=None):
+    """
+    Perform an epsilon-nondominated sort, as eps_sort_solutions does, but
+    return (objectives, tagalong) tuples for the nondominated solutions.
+    Return an empty list if there are no solutions at all.
+
+    sources: a SourceCounts to count the members from each table in, for
+             the archive and grid algorithms
+    origins: index in sources of each table, default to the table number
+    presort: see eps_sort_solutions
+    """
+    if origins is None:
+        origins = list(range(len(tables)))
+    # slip the first row off the first nonempty table to figure out nobj
+    for first in range(len(tables)):
+        try:
+            objectives, row = next(tables[first])
+            break
+        except StopIteration:
+            pass
+    else:
+        return []
+    table = [(objectives, row)]
+    tables = [table] + tables[first:]
+    origins = [origins[first]] + origins[first:]
+
+    nobj = len(objectives)
+    if epsilons is None:
+        epsilons = [1e-9] * len(objectives)
+    elif len(epsilons) != nobj:
+        msg = "{0} epsilons, but {1} objectives".format(len(epsilons), nobj)
+        raise SortParameterError(msg)
+
+    if algorithm == "kung":
+        if sources is not None:
+            msg = "the kung algorithm can't count members by source"
+            raise SortParameterError(msg)
+        return kung_sort((solution for table in tables for solution in table),
+                         epsilons)
+    elif algorithm == "grid":
+        # Any solution that loses its box would only be sorted into the
+        # archive to be replaced, and the winners go in in the order they
+        # arrived, so the archive ends up the same.
+        starts = [] # arrival number of the first solution of each table
+        count = [0]
+        def arrivals():
+            for table in tables:
+                starts.append(count[0])
+                for solution in table:
+                    count[0] += 1
+                    yield solution
+        winners = box_winners(arrivals(), epsilons)
+        winners = sorted(winners.values(), key=lambda winner: winner[1])
+        # consecutive winners from one table go in as a table of their
+        # own, so that they are counted by source
+        runs = [] # (origin, solutions)
+        for _, number, objectives, tagalong in winners:
+            origin = origins[bisect.bisect_right(starts, number) - 1]
+            if len(runs) == 0 or runs[-1][0] != origin:
+                runs.append((origin, []))
+            runs[-1][1].append((objectives, tagalong))
+        origins = [origin for origin, _ in runs]
+        tables = [table for _, table in runs]
+    elif algorithm != "archive":
+        raise SortParameterError("unknown algorithm {0}".format(algorithm))
+
+    archive = ARCHIVES.get(archive, archive)(epsilons)
+    archive.stats = stats
+    archive.sources = sources
+
+    if presort is not None and algorithm == "archive":
+        return presorted_front(archive, tables, origins, presort)
+
+    for table, origin in zip(tables, origins):
+        if sources is not None:
+            sources.source = origin
+        for objectives, row in table:
+            archive.sortinto(objectives, row)
+
+    return archive.snapshot()
+
+PRESORTS = ("sum", "lex")
+
+def presorted_front(archive, tables, origins, presort="sum"):
+    """
+    Sort every solution in tables into archive in order of the sum of
+    its epsilon box ("sum"), or of its box in lexicographic order
+    ("lex"), rather than in order of arrival, and return the front in
+    order of arrival.
+
+    A box that dominates another has a smaller sum and comes first in
+    lexicographic order, so solutions are rarely evicted: only those
+    that lose their box.  The sort is stable, so solutions in the same
+    box go in in order of arrival and the same one wins.  Which boxes
+    are nondominated doesn't depend on order, so the front is the same
+    as an archive would hold after sorting them in order of arrival,
+    and it is put back in that order.
+
+    archive: an empty archive with the sort's epsilons
+    tables: iterables of (objectives, tagalong) tuples, all held in
+            memory while they are sorted
+    origins: index of each table for archive.sources, if it has one
+    Return (objectives, tagalong) tuples.
+    """
+    if presort not in PRESORTS:
+        raise SortParameterError("unknown presort {0}".format(presort))
+    epsilons = archive.epsilons
+    itobj = range(len(epsilons))
+    solutions = []
+    keys = []
+    for table, origin in zip(tables, origins):
+        for objectives, tagalong in table:
+            ebox = [math.floor(objectives[ii] / epsilons[ii])
+                    for ii in itobj]
+            keys.append(sum(ebox) if presort == "sum" else ebox)
+            solutions.append((objectives, tagalong, origin))
+
+    sources = archive.sources
+    for arrival in sorted(range(len(solutions)), key=keys.__getitem__):
+        objectives, tagalong, origin = solutions[arrival]
+        if sources is not None:
+            sources.source = origin
+        archive.sortinto(objectives, (arrival, tagalong))
+    front = sorted(archive.snapshot(), key=lambda member: member[1][0])
+    return [(objectives, tagalong) for objectives, (_, tagalong) in front]
+
+def pareto_candidates(solutions):
+    """
+    The solutions that no other solution dominates outright, in order,
+    including any exact duplicates of them.  Whatever the epsilons, an
+    epsilon-nondominated sort of these gives the same front as a sort of
+    all the solutions: a dominated solution's box is dominated by its
+    dominator's box or shares it with a solution closer to the corner,
+    so taking it out changes nothing.  It isn't true that a coarser
+    front is a subset of a finer one, though, because a solution in a
+    dominated fine box can win a coarse box.
+
+    solutions: list of (objectives, tagalong) tuples
+    Return a list of (objectives, tagalong) tuples.
+    """
+    points = {}
+    for index, (objectives, _) in enumerate(solutions):
+        points.setdefault(tuple(objectives), []).append(index)
+    front = kung_front(sorted(points))
+    keep = sorted([index for point in front for index in points[point]])
+    return [solutions[index] for index in keep]
+
+def target_front(solutions, target, epsilons=None, archive="box",
+                 algorithm="archive", stats=None, steps=30):
+    """
+    Epsilon-nondominated sort with the epsilons scaled to give a front
+    of at most target solutions, as close to target as the search
+    allows.
+
+    The solutions are reduced once by pareto_candidates, and each step of
+    the search sorts only what is left, which for most inputs is far
+    less.  Scales are doubled or halved from 1 until the front size is
+    bracketed, and the bracket is then bisected geometrically for at
+    most steps steps, stopping early on a front of exactly target.
+    Front size mostly shrinks as epsilons grow, but not always, so the
+    result is a front at most target in size, not necessarily the
+    largest one.
+
+    Some fronts can't be made that small: once every epsilon is larger
+    than every objective value is far from zero, all the boxes are -1 or
+    0 in each objective and no coarser scale changes them.  Doubling
+    stops there, or before the epsilons overflow, and returns the
+    smallest front it found, bigger than target.
+
+    solutions: iterable of (objectives, tagalong) tuples
+    target: most solutions to keep, at least 1
+    epsilons: epsilons to scale, if None start from the range of each
+              objective
+    archive, algorithm, stats: see eps_sort_solutions
+    Return (front, epsilons): (objectives, tagalong) tuples and the
+    scaled epsilons that gave them.
+    """
+    if target < 1:
+        raise SortParameterError("target size must be at least 1")
+    candidates = pareto_candidates(list(solutions))
+    if len(candidates) == 0:
+        return [], epsilons
+
+    nobj = len(candidates[0][0])
+    if epsilons is None:
+        epsilons = []
+        for oo in range(nobj):
+            values = [objectives[oo] for objectives, _ in candidates]
+            epsilons.append((max(values) - min(values)) or 1.0)
+    elif len(epsilons) != nobj:
+        msg = "{0} epsilons, but {1} objectives".format(len(epsilons), nobj)
+        raise SortParameterError(msg)
+
+    def front_at(scale):
+        scaled = [epsilon * scale for epsilon in epsilons]
+        return front_solutions([iter(candidates)], scaled, archive,
+                               algorithm, stats), scaled
+
+    # the largest magnitude of each objective, past which boxes settle
+    bounds = [max([abs(objectives[oo]) for objectives, _ in candidates])
+              for oo in range(nobj)]
+
+    # the largest scale known to be too fine, and the smallest known to
+    # be coarse enough, with its front
+    fine = None
+    coarse, front = 1.0, front_at(1.0)
+    smallest = front
+    while len(front[0]) > target:
+        if len(front[0]) < len(smallest[0]):
+            smallest = front
+        settled = all([bound < epsilon for bound, epsilon
+                       in zip(bounds, front[1])])
+        if settled or any([math.isinf(epsilon * 2) for epsilon in front[1]]):
+            return smallest # no coarser scale gives a smaller front
+        fine, coarse = coarse, coarse * 2
+        front = front_at(coarse)
+    if fine is None:
+        fine = coarse
+        for _ in range(steps):
+            if len(front[0]) == len(candidates):
+                return front # can't get any bigger
+            fine = fine / 2
+            finer = front_at(fine)
+            if len(finer[0]) > target:
+                break
+            coarse, front = fine, finer
+        else:
+            return front
+
+    for _ in range(steps):
+        if len(front[0]) == target:
+            break
+        middle = math.sqrt(fine * coarse)
+        if not fine < middle < coarse:
+            break # out of floating-point resolution
+        between = front_at(middle)
+        if len(between[0]) > target:
+            fine = middle
+        else:
+            coarse, front = middle, between
+    return front
+
+class SpillFront(object):
+    """
+    A front kept in a temporary file rather than in memory, for
+    spill_sort: (objectives, tagalong) tuples in archive order, pickled
+    a block at a time so that it can be read back a block at a time.
+    """
+    def __init__(self, blocksize, directory=None):
+        """
+        blocksize: most solutions to pickle together
+        directory: where to make the temporary file, default to the
+                   system's temporary directory (TMPDIR)
+        """
+        import tempfile
+        self.blocksize = max(1, blocksize)
+        self.stream = tempfile.TemporaryFile(dir=directory)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def write(self, solutions):
+        """ append a list of (objectives, tagalong) tuples """
+        import pickle
+        for start in range(0, len(solutions), self.blocksize):
+            block = solutions[start:start + self.blocksize]
+            pickle.dump(block, self.stream, pickle.HIGHEST_PROTOCOL)
+            self.size += len(block)
+
+    def blocks(self):
+        """ generator of the lists of solutions, in order """
+        import pickle
+        position = 0
+        while True:
+            # other generators may read the same file in between
+            self.stream.seek(position)
+            try:
+                block = pickle.load(self.stream)
+            except EOFError:
+                return
+            position = self.stream.tell()
+            yield block
+
+    def solutions(self):
+        """ generator of the (objectives, tagalong) tuples, in order """
+        for block in self.blocks():
+            for solution in block:
+                yield solution
+
+    __iter__ = solutions
+
+    def close(self):
+        """ remove the temporary file """
+        self.stream.close()
+
+def spill_sort(solutions, epsilons, limit, archive="box", directory=None,
+               stats=None):
+    """
+    Epsilon-nondominated sort that holds at most about limit solutions in
+    memory, for fronts too big to fit.
+
+    Solutions are sorted into an archive until it holds limit of them.
+    Then its front is spilled to a temporary file and a new archive is
+    started for the rest of the input.  Epsilon-nondomination is
+    associative, so the spilled fronts of consecutive runs of the input
+    are merged pairwise, in order, round by round (a tournament), by
+    merge_spilled, which gives the same front, in the same order, as a
+    single archive.
+
+    solutions: iterable of (objectives, tagalong) tuples
+    epsilons: sizes of epsilon boxes
+    limit: most solutions to keep in memory
+    archive, stats: see eps_sort_solutions
+    directory: where to put the temporary files
+    Return a SpillFront, or a list if nothing had to be spilled.  Either
+    one can be iterated over more than once.
+    """
+    limit = max(2, limit)
+    spills = []
+    current = ARCHIVES.get(archive, archive)(epsilons)
+    current.stats = stats
+    for objectives, tagalong in solutions:
+        current.sortinto(objectives, tagalong)
+        if len(current) >= limit:
+            spilled = SpillFront(limit // 2, directory)
+            spilled.write(current.snapshot())
+            spills.append(spilled)
+            current = ARCHIVES.get(archive, archive)(epsilons)
+            current.stats = stats
+    front = current.snapshot()
+    if len(spills) == 0:
+        return front
+    if len(front) > 0:
+        spilled = SpillFront(limit // 2, directory)
+        spilled.write(front)
+        spills.append(spilled)
+    del current, front
+
+    while len(spills) > 1:
+        merged = []
+        for ii in range(0, len(spills) - 1, 2):
+            merged.append(merge_spilled(spills[ii], spills[ii + 1], epsilons,
+                                        limit, directory))
+            spills[ii].close()
+            spills[ii + 1].close()
+        if len(spills) % 2 == 1:
+            merged.append(spills[-1])
+        spills = merged
+    return spills[0]
+
+def merge_spilled(first, second, epsilons, limit, directory=None):
+    """
+    Merge two SpillFronts, the second from input that came after the
+    first's, into a new SpillFront, holding about limit solutions in
+    memory.  If both fit, this is merge_fronts.  Otherwise the survivors
+    of each block of the first front are found by streaming the second
+    front past it, and then the other way round, see spill_survivors.
+    """
+    merged = SpillFront(limit // 2, directory)
+    if len(first) + len(second) <= limit:
+        fronts = [list(first.solutions()), list(second.solutions())]
+        merged.write(merge_fronts(fronts, epsilons))
+        return merged
+    for block in first.blocks():
+        merged.write(spill_survivors(block, second.blocks(), epsilons, True))
+    for block in second.blocks():
+        merged.write(spill_survivors(block, first.blocks(), epsilons, False))
+    return merged
+
+def spill_survivors(block, blocks, epsilons, later):
+    """
+    The members of block, solutions from one front, that are still on
+    the front after sorting another front into the same archive, as an
+    Archive would decide: a member is out if a solution of the other
+    front is in a box that dominates its box, or is in its box and
+    closer to the corner.  Between equally close solutions, the later
+    one wins.
+
+    block: list of (objectives, tagalong) tuples
+    blocks: iterable of lists of (objectives, tagalong) tuples, the
+            other front
+    later: True if the other front came after block's
+    Return the surviving (objectives, tagalong) tuples, in order.
+    """
+    itobj = range(len(epsilons))
+    boxes = []
+    members = {} # box -> index into block
+    for objectives, _ in block:
+        ebox = tuple([math.floor(objectives[ii] / epsilons[ii])
+                      for ii in itobj])
+        members[ebox] = len(boxes)
+        boxes.append(ebox)
+    alive = [True] * len(block)
+
+    boxarray = int_boxes(boxes, len(epsilons))
+    for other in blocks:
+        others = []
+        for objectives, _ in other:
+            ebox = tuple([math.floor(objectives[ii] / epsilons[ii])
+                          for ii in itobj])
+            index = members.get(ebox)
+            if index is None:
+                others.append(ebox)
+                continue
+            # same box: only one solution can win it
+            corner = [ebox[ii] * epsilons[ii] for ii in itobj]
+            odist = sum([(objectives[ii] - corner[ii]) **2 for ii in itobj])
+            mine = block[index][0]
+            mdist = sum([(mine[ii] - corner[ii]) **2 for ii in itobj])
+            if (odist <= mdist) if later else (odist < mdist):
+                alive[index] = False
+
+        # boxes in others can't be the same as any in boxes, so weak
+        # dominance is dominance
+        otherarray = None if boxarray is None else int_boxes(others,
+                                                             len(epsilons))
+        if otherarray is None:
+            for index, ebox in enumerate(boxes):
+                if not alive[index]:
+                    continue
+                for obox in others:
+                    for oo in itobj:
+                        if obox[oo] > ebox[oo]:
+                            break
+                    else:
+                        alive[index] = False
+                        break
+            continue
+        np = get_numpy()
+        step = max(1, 2**22 // max(1, len(boxes) * len(itobj)))
+        for start in range(0, len(otherarray), step):
+            chunk = otherarray[start:start + step]
+            weak = np.ones((len(boxes), len(chunk)), dtype=bool)
+            for oo in itobj:
+                weak &= chunk[None, :, oo] <= boxarray[:, None, oo]
+            for index in weak.any(axis=1).nonzero()[0].tolist():
+                alive[index] = False
+
+    return [solution for solution, keep in zip(block, alive) if keep]
+
+def solution_bytes(objectives, tagalong):
+    """
+    rough number of bytes of memory that a solution takes up in an
+    archive, counting its objectives, its box and a tagalong that is a
+    flat list or tuple
+    """
+    size = 2 * sys.getsizeof(objectives) # objectives and box
+    size += 2 * sum([sys.getsizeof(x) for x in objectives])
+    size += sys.getsizeof(tagalong)
+    if isinstance(tagalong, (list, tuple)):
+        size += sum([sys.getsizeof(x) for x in tagalong])
+    return size + 64 # tuple and list slots
+
+def int_boxes(boxes, nobj):
+    """
+    boxes as a 2-d int64 ndarray for vectorized comparison, or None if
+    NumPy isn't installed or they don't fit in int64
+    """
+    np = get_numpy()
+    if np is None:
+        return None
+    try:
+        return np.array(boxes, dtype=np.int64).reshape(-1, nobj)
+    except OverflowError:
+        return None
+
+def get_numpy():
+    """ import NumPy on demand, return None if it is not installed """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def as_array(table, columns=False):
+    """
+    return table as a 2-d NumPy ndarray if it is an ndarray or a
+    DataFrame, otherwise return None
+
+    columns: return a DataFrame as it is instead, for callers that only
+             want some of its columns, see objective_matrix.  Converting
+             a DataFrame with mixed column types copies every cell.
+    """
+    np = get_numpy()
+    if np is None:
+        return None
+    if isinstance(table, np.ndarray):
+        mat = table
+    elif columns and hasattr(table, "iloc") and hasattr(table, "to_numpy"):
+        mat = table
+    else:
+        try: # is it a Pandas DataFrame?
+            mat = table.to_numpy()
+        except AttributeError:
+            return None
+    if mat.ndim != 2:
+        return None
+    return mat
+
+def sort_engine(kwargs):
+    """
+    the engine for eps_sort or flag_nondominated: "auto" becomes
+    "python" if any keyword argument that only the row-by-row sort
+    honours is given, and "numpy" with one is a TypeError
+    """
+    engine = kwargs.get("engine", "auto")
+    rowwise = [key for key in ("archive", "algorithm", "presort", "stats")
+               if kwargs.get(key) is not None]
+    if rowwise and engine == "numpy":
+        msg = "engine numpy does not take {0}".format(", ".join(rowwise))
+        raise TypeError(msg)
+    if rowwise and engine == "auto":
+        return "python"
+    return engine
+
+def engine_arrays(tables, engine="auto", columns=False):
+    """
+    decide whether eps_sort_indices can do the sort
+
+    Return a list of 2-d ndarrays if it can, or None if the sort has to
+    go row by row.  A single ndarray or DataFrame comes back as an
+    ndarray rather than a list.  Generators are never inspected, because
+    that would consume them.
+
+    columns: leave DataFrames as they are, see as_array
+    """
+    if engine == "python":
+        return None
+    if engine not in ("auto", "numpy"):
+        raise SortParameterError("unknown engine {0}".format(engine))
+
+    arrays = as_array(tables, columns)
+    if arrays is None and isinstance(tables, (list, tuple)) and tables:
+        arrays = []
+        for table in tables:
+            mat = as_array(table, columns)
+            if mat is None:
+                arrays = None
+                break
+            arrays.append(mat)
+
+    if arrays is None and engine == "numpy":
+        msg = "engine numpy needs NumPy and ndarray or DataFrame input"
+        raise SortParameterError(msg)
+    return arrays
+
+def array_masks(arrays, objectives=None, epsilons=None, **kwargs):
+    """
+    Epsilon-nondominated sort of 2-d ndarrays, returning a boolean
+    ndarray for each table that is True for its nondominated rows.
+    Arguments and keyword arguments are the same as for eps_sort.
+    The masks are views of one boolean ndarray, one byte per row.
+    """
+    np = get_numpy()
+    lengths = [len(mat) for mat in arrays]
+    nobj = arrays[0].shape[1] if objectives is None else len(objectives)
+    jobs = kwargs.get("jobs", 1)
+    memory = None
+    if jobs > 1 and len(arrays) > 0:
+        memory = shared_memory(sum(lengths) * nobj * 8)
+    try:
+        matrix = objective_matrix(arrays, objectives,
+                                  None if memory is None else memory.buf)
+
+        tomaximize = kwargs.get("maximize", None)
+        maximize_all = kwargs.get("maximize_all", False)
+        if maximize_all:
+            np.negative(matrix, out=matrix)
+        elif tomaximize is not None:
+            if objectives is None:
+                mindices = tomaximize
+            else:
+                mindices = [objectives.index(i) for i in tomaximize]
+            matrix[:, mindices] = -matrix[:, mindices]
+
+        if memory is None:
+            indices = eps_sort_indices(matrix, epsilons)
+        else:
+            indices = shared_sort_indices(memory.name, matrix.shape, lengths,
+                                          epsilons, jobs)
+        del matrix # a view of memory, which can't be closed while it lives
+    finally:
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+
+    mask = np.zeros(sum(lengths), dtype=bool)
+    mask[indices] = True
+
+    masks = []
+    start = 0
+    for mat in arrays:
+        masks.append(mask[start:start + len(mat)])
+        start += len(mat)
+    return masks
+
+def objective_matrix(arrays, objectives=None, buffer=None):
+    """
+    the objectives of 2-d ndarrays or DataFrames, one after another, as
+    a single float ndarray.  It is filled a column at a time, so the
+    only copy made is the result.
+
+    buffer: memory to put the result in, for example shared memory,
+            default to a new ndarray
+    """
+    np = get_numpy()
+    ncolumn = arrays[0].shape[1]
+    if objectives is None:
+        objectives = range(ncolumn)
+    shape = (sum([len(mat) for mat in arrays]), len(objectives))
+    if buffer is None:
+        matrix = np.empty(shape)
+    else:
+        matrix = np.ndarray(shape, buffer=buffer)
+    start = 0
+    for mat in arrays:
+        if mat.shape[1] != ncolumn:
+            msg = "tables with {0} and {1} columns".format(ncolumn,
+                                                           mat.shape[1])
+            raise SortParameterError(msg)
+        stop = start + len(mat)
+        for jj, oo in enumerate(objectives):
+            if isinstance(mat, np.ndarray):
+                matrix[start:stop, jj] = mat[:, oo]
+            else:
+                matrix[start:stop, jj] = mat.iloc[:, oo].to_numpy()
+        start = stop
+    return matrix
+
+def shared_memory(size, name=None):
+    """
+    a multiprocessing SharedMemory block of size bytes, or the existing
+    one called name.  Return None if there is nothing to share or
+    shared memory isn't available (before Python 3.8).
+    """
+    try:
+        from multiprocessing.shared_memory import SharedMemory
+    except ImportError:
+        return None
+    if name is not None:
+        return SharedMemory(name)
+    if size == 0:
+        return None
+    return SharedMemory(create=True, size=size)
+
+def shared_sort_indices(name, shape, lengths, epsilons, jobs):
+    """
+    eps_sort_indices for a matrix of objectives in shared memory, in
+    jobs worker processes.  Each table, of lengths rows, is split into
+    enough shards to keep the workers busy, the shards are sorted and
+    then their fronts are merged by merge_tree.  Only row indices go
+    between processes; the workers read the objectives from the shared
+    memory block called name.
+    Return the indices of the nondominated rows in increasing order.
+    """
+    nshards = max(1, jobs // len(lengths))
+    tasks = []
+    start = 0
+    for length in lengths:
+        step = length // nshards + 1
+        for first in range(start, start + length, step):
+            tasks.append((name, shape, first, min(first + step,
+                                                  start + length), epsilons))
+        start += length
+
+    import multiprocessing
+    pool = multiprocessing.Pool(jobs)
+    try:
+        fronts = pool.map(sort_shared_shard, tasks, 1)
+        if len(fronts) == 0:
+            return get_numpy().zeros(0, dtype=int)
+        return merge_tree(fronts, merge_shared_fronts, pool, name, shape,
+                          epsilons)
+    finally:
+        pool.close()
+        pool.join()
+
+def sort_shared_shard(task):
+    """
+    eps_sort_indices for rows start to stop of the matrix in shared
+    memory, in a worker process, see shared_sort_indices
+    """
+    name, shape, start, stop, epsilons = task
+    memory = shared_memory(0, name)
+    try:
+        matrix = get_numpy().ndarray(shape, buffer=memory.buf)
+        indices = start + eps_sort_indices(matrix[start:stop], epsilons)
+        del matrix
+    finally:
+        memory.close()
+    return indices
+
+def merge_shared_fronts(task):
+    """
+    merge the fronts of two consecutive shards of the matrix in shared
+    memory, given as increasing row indices, for merge_tree
+    """
+    first, second, name, shape, epsilons = task
+    np = get_numpy()
+    rows = np.concatenate([first, second])
+    memory = shared_memory(0, name)
+    try:
+        matrix = np.ndarray(shape, buffer=memory.buf)
+        front = rows[eps_sort_indices(matrix[rows], epsilons)]
+        del matrix
+    finally:
+        memory.close()
+    return front
+
+def eps_sort_indices(matrix, epsilons=None, blocksize=2**22, frontblock=256):
+    """
+    Vectorized epsilon-nondominated sort of a 2-d float ndarray of
+    objectives (minimization assumed), one row per solution.  Return
+    the indices of the nondominated rows in increasing order, which is
+    the order in which an Archive would hold them.
+
+    matrix: objectives, one row per solution
+    epsilons: epsilon values for the objectives.  Assume 1e-9 if none
+    blocksize: approximate number of box comparisons to make at once,
+               which bounds the size of the temporary arrays
+    frontblock: number of candidate boxes to settle at once
+
+    Boxes and corner distances are computed exactly as Archive.sortinto
+    computes them, so ties come out the same way: within a box the row
+    closest to the box corner wins, and among equally close rows the
+    last one wins.
+    """
+    np = get_numpy()
+    nrow, nobj = matrix.shape
+    if epsilons is None:
+        epsilons = [1e-9] * nobj
+    elif len(epsilons) != nobj:
+        msg = "{0} epsilons, but {1} objectives".format(len(epsilons), nobj)
+        raise SortParameterError(msg)
+    if nrow == 0:
+        return np.zeros(0, dtype=np.intp)
+
+    epsilons = np.array(epsilons, dtype=float)
+    boxes = np.floor(matrix / epsilons)
+    if not np.isfinite(boxes).all():
+        raise ValueError("objectives must be finite")
+
+    # sum in the same order as Archive.sortinto so that ties break alike
+    corners = boxes * epsilons
+    dist = np.zeros(nrow)
+    for oo in range(nobj):
+        dist += (matrix[:, oo] - corners[:, oo]) ** 2
+
+    # Most rows of a large input are usually in boxes dominated by one of
+    # the boxes with the smallest sums, so throw those out before sorting.
+    rows = np.arange(nrow)
+    npivot = 16
+    if nrow > frontblock:
+        sums = boxes.sum(axis=1)
+        pivots = boxes[np.argpartition(sums, npivot)[:npivot]]
+        step = max(1, blocksize // npivot)
+        dominated = np.zeros(nrow, dtype=bool)
+        for start in range(0, nrow, step):
+            chunk = boxes[start:start + step]
+            below = np.ones((len(chunk), npivot), dtype=bool)
+            strictly = np.zeros((len(chunk), npivot), dtype=bool)
+            for oo in range(nobj):
+                below &= pivots[None, :, oo] <= chunk[:, None, oo]
+                strictly |= pivots[None, :, oo] < chunk[:, None, oo]
+            dominated[start:start + step] = (below & strictly).any(axis=1)
+        rows = rows[~dominated]
+        boxes = boxes[rows]
+        dist = dist[rows]
+
+    # order rows by box, then distance, then latest first, so that the
+    # first row in each box is the one that wins the box
+    keys = [-rows, dist]
+    keys.extend([boxes[:, oo] for oo in reversed(range(nobj))])
+    order = np.lexsort(keys)
+    boxes = boxes[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (boxes[1:] != boxes[:-1]).any(axis=1)
+    winners = rows[order[first]]
+    boxes = boxes[first]
+
+    front = front_boxes(boxes, blocksize, frontblock)
+    return np.sort(winners[front])
+
+def front_boxes(boxes, blocksize=2**22, frontblock=256, alive=None):
+    """
+    Vectorized nondominated filter for a 2-d ndarray of distinct boxes,
+    one row per box.  Return the indices of the nondominated boxes, in
+    order of their sums.  See eps_sort_indices for blocksize and
+    frontblock.
+
+    alive: indices of the boxes to filter, in order of their sums.
+           Default to all of them.
+    """
+    np = get_numpy()
+    nobj = boxes.shape[1]
+
+    # A box can only be dominated by a box with a smaller sum, so take
+    # boxes a block at a time in order of their sums.  Whatever survives
+    # comparison with the rest of its block is on the front, and it is
+    # used to throw out every remaining box it dominates.
+    if alive is None:
+        keys = [boxes[:, oo] for oo in reversed(range(nobj))]
+        keys.append(boxes.sum(axis=1))
+        alive = np.lexsort(keys)
+    front = []
+    while alive.size > 0:
+        block = boxes[alive[:frontblock]]
+        weak = np.ones((len(block), len(block)), dtype=bool)
+        for oo in range(nobj):
+            weak &= block[None, :, oo] <= block[:, None, oo]
+        np.fill_diagonal(weak, False)
+        survivors = alive[:frontblock][~weak.any(axis=1)]
+        front.append(survivors)
+
+        alive = alive[frontblock:]
+        best = boxes[survivors]
+        step = max(1, blocksize // len(best))
+        dominated = np.zeros(len(alive), dtype=bool)
+        for start in range(0, len(alive), step):
+            chunk = boxes[alive[start:start + step]]
+            weak = np.ones((len(chunk), len(best)), dtype=bool)
+            for oo in range(nobj):
+                weak &= best[None, :, oo] <= chunk[:, None, oo]
+            dominated[start:start + step] = weak.any(axis=1)
+        alive = alive[~dominated]
+
+    if len(front) == 0:
+        return np.zeros(0, dtype=np.intp)
+    return np.concatenate(front)
+
+METRICS = ("hypervolume", "epsilon", "gd")
+
+def front_points(front, objectives=None, **kwargs):
+    """
+    objectives of each member of a front, minimized
+
+    front: an Archive, whose members are already minimized, or rows like
+           eps_sort returns, a table as for eps_sort
+    objectives, maximize, maximize_all: see eps_sort, for rows
+    """
+    if isinstance(front, Archive):
+        return [list(point) for point, _ in front.snapshot()]
+    kwargs = dict(kwargs)
+    kwargs["attribution"] = False
+    return [point for point, _ in
+            table_solutions(as_table(front), 0, objectives, **kwargs)]
+
+def nondominated_points(points):
+    """
+    the points that no other point weakly dominates, keeping one of
+    any duplicates, in lexicographic order
+    """
+    front = []
+    for point in sorted(points):
+        for other in front:
+            for ii in range(len(point)):
+                if other[ii] > point[ii]:
+                    break
+            else:
+                break # other weakly dominates point
+        else:
+            front.append(point)
+    return front
+
+def hypervolume(points, reference):
+    """
+    Exact hypervolume of the region that points dominate and that
+    dominates the reference point, all objectives minimized.
+
+    Two objectives take a sweep, three a sweep over the third objective
+    with a staircase of the other two, and more use WFG (While, Bradstreet
+    and Barone 2012): sorted worst first in the last objective, each
+    point's exclusive volume is its slab's depth times its exclusive
+    volume among the later points in one objective fewer.  That is
+    exponential in the number of objectives, so above six or so
+    hypervolume_estimate is the better choice.
+    """
+    reference = [float(x) for x in reference]
+    points = [[float(x) for x in point] for point in points
+              if all([x < rr for x, rr in zip(point, reference)])]
+    if len(reference) > 3:
+        points = nondominated_points(points)
+    return wfg_volume(points, reference)
+
+def wfg_volume(front, reference):
+    """
+    hypervolume of points that dominate reference, which must be
+    nondominated for speed (but not for correctness) above three
+    objectives
+    """
+    nobj = len(reference)
+    if len(front) == 0:
+        return 0.0
+    if nobj == 1:
+        return reference[0] - min([point[0] for point in front])
+    if nobj == 2:
+        return sweep_volume(front, reference)
+    if nobj == 3:
+        return staircase_volume(front, reference)
+
+    front = sorted(front, key=lambda point: point[-1], reverse=True)
+    volume = 0.0
+    for ii, point in enumerate(front):
+        head = point[:-1]
+        inclusive = 1.0
+        for x, rr in zip(head, reference):
+            inclusive *= rr - x
+        limited = [[max(x, y) for x, y in zip(head, other)]
+                   for other in front[ii + 1:]]
+        if nobj > 4:
+            limited = nondominated_points(limited)
+        exclusive = inclusive - wfg_volume(limited, reference[:-1])
+        volume += (reference[-1] - point[-1]) * exclusive
+    return volume
+
+def sweep_volume(front, reference):
+    """ two-objective hypervolume by a sweep along the first objective """
+    volume = 0.0
+    height = reference[1]
+    for x, y in sorted(front):
+        if y < height:
+            volume += (reference[0] - x) * (height - y)
+            height = y
+    return volume
+
+def staircase_volume(front, reference):
+    """
+    three-objective hypervolume: slices along the third objective, each
+    as thick as the gap to the next point, times the area dominated by
+    the points so far.  That area is kept up to date in a staircase of
+    the first two objectives as each point is added.
+    """
+    xs = [] # staircase, x ascending and y descending
+    ys = []
+    area = 0.0
+    volume = 0.0
+    front = sorted(front, key=lambda point: point[2])
+    for ii, (x, y, z) in enumerate(front):
+        left = bisect.bisect_right(xs, x)
+        if left > 0 and ys[left - 1] <= y:
+            height = None # dominated in the first two objectives
+        else:
+            height = ys[left - 1] if left > 0 else reference[1]
+            start = bisect.bisect_left(xs, x)
+            stop = start
+            position = x
+            while stop < len(xs) and ys[stop] >= y:
+                area += (xs[stop] - position) * (height - y)
+                position = xs[stop]
+                height = ys[stop]
+                stop += 1
+            end = xs[stop] if stop < len(xs) else reference[0]
+            area += (end - position) * (height - y)
+            xs[start:stop] = [x]
+            ys[start:stop] = [y]
+        top = front[ii + 1][2] if ii + 1 < len(front) else reference[2]
+        volume += (top - z) * area
+    return volume
+
+def hypervolume_estimate(points, reference, samples=100000, seed=1):
+    """
+    Monte Carlo estimate of hypervolume, for fronts with too many
+    objectives for the exact calculation: the volume of the box between
+    the best of each objective and the reference point, times the
+    fraction of uniformly drawn samples in it that some point dominates.
+    Vectorized if NumPy is installed.
+    """
+    reference = [float(x) for x in reference]
+    points = [[float(x) for x in point] for point in points
+              if all([x < rr for x, rr in zip(point, reference)])]
+    if len(points) == 0:
+        return 0.0
+    nobj = len(reference)
+    lower = [min([point[ii] for point in points]) for ii in range(nobj)]
+    box = 1.0
+    for low, rr in zip(lower, reference):
+        box *= rr - low
+    points = nondominated_points(points)
+
+    np = get_numpy()
+    if np is None:
+        import random
+        rng = random.Random(seed)
+        hits = 0
+        for _ in range(samples):
+            sample = [rng.uniform(low, rr)
+                      for low, rr in zip(lower, reference)]
+            for point in points:
+                if all([x <= s for x, s in zip(point, sample)]):
+                    hits += 1
+                    break
+        return box * hits / float(samples)
+
+    rng = np.random.RandomState(seed)
+    front = np.array(points)
+    hits = 0
+    step = 65536
+    for start in range(0, samples, step):
+        size = min(step, samples - start)
+        sample = rng.uniform(lower, reference, (size, nobj))
+        dominated = np.zeros(size, dtype=bool)
+        for point in front:
+            dominated |= (sample >= point).all(axis=1)
+        hits += int(dominated.sum())
+    return box * hits / float(samples)
+
+def point_chunks(points, referenceset, blocksize=2**22):
+    """
+    pairs of 2-d ndarrays: points, and consecutive chunks of the
+    reference set small enough that chunk x points x objectives has
+    about blocksize elements
+    """
+    np = get_numpy()
+    points = np.array(points, dtype=float)
+    referenceset = np.array(referenceset, dtype=float)
+    step = max(1, blocksize // max(1, points.size))
+    for start in range(0, len(referenceset), step):
+        yield points, referenceset[start:start + step]
+
+def eps_indicator(points, referenceset):
+    """
+    Additive epsilon indicator of points with respect to a reference
+    set, all objectives minimized: the smallest amount that has to be
+    taken off every objective of the points so that together they weakly
+    dominate every reference point.  Zero or less if they already do.
+    """
+    if len(points) == 0 or len(referenceset) == 0:
+        return None
+    np = get_numpy()
+    if np is None:
+        return max([min([max([x - rr for x, rr in zip(point, target)])
+                         for point in points])
+                    for target in referenceset])
+    worst = None
+    for front, chunk in point_chunks(points, referenceset):
+        shift = (front[None, :, :] - chunk[:, None, :]).max(axis=2)
+        value = float(shift.min(axis=1).max())
+        worst = value if worst is None else max(worst, value)
+    return worst
+
+def generational_distance(points, referenceset):
+    """
+    Generational distance of points from a reference set: the mean
+    Euclidean distance from each point to the nearest reference point.
+    """
+    if len(points) == 0 or len(referenceset) == 0:
+        return None
+    np = get_numpy()
+    if np is None:
+        total = 0.0
+        for point in points:
+            total += math.sqrt(min([sum([(x - rr) ** 2 for x, rr in
+                                         zip(point, target)])
+                                    for target in referenceset]))
+        return total / len(points)
+    nearest = []
+    for targets, chunk in point_chunks(referenceset, points):
+        squared = ((chunk[:, None, :] - targets[None, :, :]) ** 2).sum(axis=2)
+        nearest.append(squared.min(axis=1))
+    return float(np.sqrt(np.concatenate(nearest)).mean())
+
+def point_metrics(points, reference=None, targets=None, metrics=None,
+                  exact=None, samples=100000):
+    """
+    Quality metrics of a front, as an OrderedDict of name -> value.
+
+    points: objectives of each member of the front, minimized
+    reference: reference point for hypervolume, minimized
+    targets: reference set for epsilon and gd, minimized
+    metrics: names from METRICS to compute, default all of them that
+             reference and targets allow
+    exact: True for hypervolume, False for hypervolume_estimate with
+           this many samples, default True up to six objectives
+    """
+    if metrics is None:
+        metrics = [name for name in METRICS
+                   if (reference if name == "hypervolume"
+                       else targets) is not None]
+
+    result = OrderedDict()
+    result["size"] = len(points)
+    if "hypervolume" in metrics:
+        if reference is None:
+            raise SortParameterError("hypervolume needs a reference point")
+        if len(points) > 0 and len(reference) != len(points[0]):
+            msg = "reference point has {0} objectives, front has {1}".format(
+                len(reference), len(points[0]))
+            raise SortParameterError(msg)
+        if exact is None:
+            exact = len(reference) <= 6
+        if exact:
+            result["hypervolume"] = hypervolume(points, reference)
+        else:
+            result["hypervolume"] = hypervolume_estimate(points, reference,
+                                                         samples)
+    if "epsilon" in metrics or "gd" in metrics:
+        if targets is None:
+            raise SortParameterError("epsilon and gd need a reference set")
+        if "epsilon" in metrics:
+            result["epsilon"] = eps_indicator(points, targets)
+        if "gd" in metrics:
+            result["gd"] = generational_distance(points, targets)
+    return result
+
+def front_metrics(front, objectives=None, reference=None, referenceset=None,
+                  **kwargs):
+    """
+    Quality metrics of a front, see point_metrics
+
+    front: an Archive, or rows like eps_sort returns, see front_points
+    objectives: see eps_sort, for the rows of front and of referenceset
+    reference: reference point for hypervolume, one value per objective,
+               not negated for maximization
+    referenceset: table of reference points for epsilon and gd, like an
+                  input to eps_sort
+
+    Keyword arguments:
+    *maximize*      columns to maximize
+    *maximize_all*  maximize all columns
+    *metrics*       names from METRICS to compute, see point_metrics
+    *exact*         see point_metrics
+    *samples*       samples for hypervolume_estimate, default 100000
+    """
+    points = front_points(front, objectives, **kwargs)
+    if reference is not None:
+        reference = [float(x) for x in reference]
+        mindices = kwargs.get("maximize")
+        if kwargs.get("maximize_all", False):
+            mindices = range(len(reference))
+        elif mindices is not None and objectives is not None:
+            mindices = [objectives.index(i) for i in mindices]
+        for ii in mindices or []:
+            reference[ii] = 0 - reference[ii]
+    targets = None
+    if referenceset is not None:
+        targets = front_points(referenceset, objectives, **kwargs)
+    return point_metrics(points, reference, targets, kwargs.get("metrics"),
+                         kwargs.get("exact"), kwargs.get("samples", 100000))
+
+BINARY_MAGIC = b"PARETO\x00\x01" # first bytes of a binary front
+
+class BinaryFront(object):
+    """
+    A front in the binary columnar format, read from bytes or an mmap
+    without parsing any text.  All numbers are little-endian and every
+    section starts on a multiple of 8 bytes:
+
+    magic:      BINARY_MAGIC
+    length:     uint64, length of the header
+    header:     UTF-8 JSON: {"rows": number of rows,
+                "objectives": number of objective columns,
+                "refs": names of the integer columns, for example
+                ["source", "line"], "sources": input filenames that
+                "source" indexes, "text": whether the rows' text is
+                stored}, padded with spaces
+    objectives: one column of float64 per objective
+    refs:       one column of int64 per ref
+    offsets:    if there is text, rows + 1 int64, where each row's text
+                starts in the blob and where the last one ends
+    blob:       the text of the rows, UTF-8 encoded, back to back
+
+    With NumPy installed, columns are ndarrays that share memory with
+    the buffer, otherwise they are arrays.
+    """
+    def __init__(self, buffer):
+        """ buffer: bytes or mmap holding the front """
+        import json
+        import struct
+        if bytes(buffer[:len(BINARY_MAGIC)]) != BINARY_MAGIC:
+            raise ValueError("not a binary front")
+        start = len(BINARY_MAGIC)
+        length = struct.unpack("<Q", bytes(buffer[start:start + 8]))[0]
+        start += 8
+        header = json.loads(bytes(buffer[start:start + length]).decode(
+            "utf-8"))
+        self.buffer = buffer
+        self.nrow = header["rows"]
+        self.nobj = header["objectives"]
+        self.refnames = header.get("refs", [])
+        self.sources = header.get("sources", [])
+        self.hastext = header.get("text", False)
+        self.start = start + length
+        self.offsets = None # of the text of each row in the blob
+        ncolumn = self.nobj + len(self.refnames)
+        self.blob = self.start + 8 * (self.nrow * ncolumn + self.nrow + 1)
+
+    def column(self, index, typecode, count=None):
+        """
+        the index'th column of 8-byte numbers after the header,
+        typecode "d" for float64 or "q" for int64
+        count: length of the column, default to the number of rows
+        """
+        if count is None:
+            count = self.nrow
+        offset = self.start + 8 * self.nrow * index
+        np = get_numpy()
+        if np is not None:
+            dtype = "<f8" if typecode == "d" else "<i8"
+            if count == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.frombuffer(self.buffer, dtype=dtype, count=count,
+                                 offset=offset)
+        values = array(typecode)
+        data = bytes(self.buffer[offset:offset + 8 * count])
+        getattr(values, "frombytes", getattr(values, "fromstring", None))(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def objectives(self):
+        """ objective columns """
+        return [self.column(ii, "d") for ii in range(self.nobj)]
+
+    def refs(self):
+        """ integer columns, one for each of refnames """
+        return [self.column(self.nobj + ii, "q")
+                for ii in range(len(self.refnames))]
+
+    def text(self, index):
+        """ the text of one row, or None if there isn't any """
+        if not self.hastext:
+            return None
+        if self.offsets is None:
+            self.offsets = self.column(self.nobj + len(self.refnames), "q",
+                                       self.nrow + 1)
+        start = self.blob + int(self.offsets[index])
+        stop = self.blob + int(self.offsets[index + 1])
+        return bytes(self.buffer[start:stop]).decode("utf-8")
+
+    def texts(self):
+        """ the text of each row as a list of strings, or None """
+        if not self.hastext:
+            return None
+        return [self.text(ii) for ii in range(self.nrow)]
+
+def write_front(stream, objectives, texts=None, refs=None, refnames=(),
+                sources=()):
+    """
+    write a front in the binary columnar format, see BinaryFront
+
+    stream: binary stream to write to
+    objectives: a list of objective values for each row
+    texts: the text of each row, or None to store none
+    refs: a list of integers for each row, one for each of refnames
+    sources: filenames for the "source" ref to index
+    """
+    import json
+    import struct
+    nrow = len(objectives)
+    nobj = len(objectives[0]) if nrow > 0 else 0
+    header = json.dumps({"rows": nrow, "objectives": nobj,
+                         "refs": list(refnames), "sources": list(sources),
+                         "text": texts is not None}).encode("utf-8")
+    header += b" " * (-(len(BINARY_MAGIC) + 8 + len(header)) % 8)
+    stream.write(BINARY_MAGIC)
+    stream.write(struct.pack("<Q", len(header)))
+    stream.write(header)
+
+    columns = [array("d", [row[ii] for row in objectives])
+               for ii in range(nobj)]
+    columns.extend([array("q", [row[ii] for row in refs])
+                    for ii in range(len(refnames))])
+    if texts is not None:
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = array("q", [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        columns.append(offsets)
+    for column in columns:
+        if sys.byteorder == "big":
+            column.byteswap()
+        stream.write(getattr(column, "tobytes",
+                             getattr(column, "tostring", None))())
+    if texts is not None:
+        stream.write(b"".join(encoded))
+
+def attribution(stream, tag, number=False, linenumber=0):
+    """
+    extract lines from stream and augment with tag
+    linenumber: number of lines already read from the stream
+    """
+    if number:
+        for line in stream:
+            linenumber += 1
+            line = line.strip()
+            yield (line, [tag, str(linenumber)])
+    else:
+        for line in stream:
+            line = line.strip()
+            yield (line, [tag])
+
+def noattribution(stream):
+    """
     extract lines from stream and augment with null attribution
     """
     empty = []
@@ -591,24 +3607,30 @@ def maximize(solutions, mindices=None):
                 objectives[ii] = 0 - objectives[ii]
             yield objectives, row
 
-def cli(args):
-    """ command-line interface, execute the comparison """
+def cli_table(stream, tag, args, linenumber=0, header=None):
+    """
+    generator of (objectives, row) tuples from the lines of one input,
+    as configured by the command-line arguments
+
+    linenumber: number of lines already read from the input
+    header: number of header lines to skip, default to args.header
+    """
+    if header is None:
+        header = args.header
+
     if args.contribution:
-        tables = [attribution(fp, fp.name, args.line_number)
-                  for fp in args.inputs]
+        annotatedlines = attribution(stream, tag, args.line_number,
+                                     linenumber)
     else:
-        tables = [noattribution(fp) for fp in args.inputs]
+        annotatedlines = noattribution(stream)
 
-    if args.header > 0 or len(args.comment) > 0 or args.blank:
-        tables = [filter_lines(annotatedlines, comment=args.comment,
-                              header=args.header, blank=args.blank)
-                  for annotatedlines in tables]
+    if header > 0 or len(args.comment) > 0 or args.blank:
+        annotatedlines = filter_lines(annotatedlines, comment=args.comment,
+                                      header=header, blank=args.blank)
 
-    tables = [rowsof(annotatedlines, args.delimiter)
-              for annotatedlines in tables]
+    annotatedrows = rowsof(annotatedlines, args.delimiter)
 
-    tables = [withobjectives(annotatedrows, args.objectives)
-              for annotatedrows in tables]
+    solutions = withobjectives(annotatedrows, args.objectives)
 
     if args.maximize is not None or args.maximize_all:
         if args.objectives is None:
@@ -617,21 +3639,1215 @@ def cli(args):
             mindices = None
         else:
             mindices = [args.objectives.index(i) for i in args.maximize]
-        tables = [maximize(solutions, mindices) for solutions in tables]
+        solutions = maximize(solutions, mindices)
+
+    return solutions
+
+def line_chunks(lines, size=65536):
+    """ generator of lists of up to size lines from an iterable of lines """
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+def stream_chunks(stream, size=2**24):
+    """
+    generator of lists of lines, reading about size characters from a
+    text stream at a time instead of a line at a time
+    """
+    partial = ""
+    while True:
+        block = stream.read(size)
+        if not block:
+            break
+        lines = (partial + block).split("\n")
+        partial = lines.pop()
+        yield lines
+    if partial:
+        yield [partial]
+
+def cli_mindices(args):
+    """
+    indices into the objectives of those to maximize, None to maximize
+    all of them, or an empty list to maximize none
+    """
+    if args.maximize_all:
+        return None
+    if args.maximize is None:
+        return []
+    if args.objectives is None:
+        return args.maximize
+    return [args.objectives.index(i) for i in args.maximize]
+
+def keep_lines(lines, header, comment, blank):
+    """
+    filter a chunk of stripped lines, as filter_lines does
+    return the indices of the lines to keep, and the number of header
+    lines still to skip after this chunk
+    """
+    skip = min(header, len(lines))
+    keep = range(skip, len(lines))
+    if len(comment) > 0 or blank:
+        comment = tuple(comment)
+        keep = [ii for ii in keep
+                if not ((comment and lines[ii].startswith(comment)) or
+                        (blank and len(lines[ii]) == 0))]
+    return keep, header - skip
+
+def chunk_solutions(lines, args, delimiter):
+    """
+    Parse the objectives from a chunk of stripped lines (str or bytes).
+    Generator of (index of line, objectives) tuples.
+
+    With NumPy, the objective columns of the chunk are parsed at once by
+    numpy.loadtxt, and the chunk is sorted by eps_sort_indices so that only
+    its nondominated lines come out.  Without NumPy (or with a delimiter
+    longer than one character), every line comes out, parsed in one
+    tight loop.
+
+    delimiter: args.delimiter, as bytes if the lines are bytes
+    """
+    mindices = cli_mindices(args)
+    np = get_numpy()
+    if np is not None and len(args.delimiter) == 1:
+        # loadtxt skips empty lines, which would misalign the rows of the
+        # matrix with the lines, so fail on them as float("") does
+        for line in lines:
+            if not line:
+                float(line)
+        matrix = np.loadtxt(lines, delimiter=args.delimiter,
+                            usecols=args.objectives, ndmin=2,
+                            comments=None, dtype=float)
+        if mindices is None:
+            matrix = -matrix
+        elif len(mindices) > 0:
+            matrix[:, mindices] = -matrix[:, mindices]
+        for ii in eps_sort_indices(matrix, args.epsilons).tolist():
+            yield ii, matrix[ii].tolist()
+        return
+
+    for ii, line in enumerate(lines):
+        fields = line.split(delimiter)
+        if args.objectives is None:
+            objectives = [float(x) for x in fields]
+        else:
+            objectives = [float(fields[oo]) for oo in args.objectives]
+        if mindices is None:
+            objectives = [-x for x in objectives]
+        else:
+            for oo in mindices:
+                objectives[oo] = 0 - objectives[oo]
+        yield ii, objectives
+
+def bulk_table(chunks, tag, args, linenumber=0, header=None):
+    """
+    --bulk version of cli_table: generator of (objectives, row) tuples
+    from chunks of lines of one input.
+
+    Each chunk is parsed at once by chunk_solutions.  With NumPy only the
+    nondominated rows of each chunk come out, but the chunks are
+    consecutive, so the front of what comes out is the front of the whole
+    input.  Rows are split only when --print-only-objectives needs them
+    to be: otherwise a row is the stripped line plus any attribution.
+
+    chunks: iterable of lists of lines, see stream_chunks and line_chunks
+    linenumber: number of lines already read from the input
+    header: number of header lines to skip, default to args.header
+    """
+    if header is None:
+        header = args.header
+
+    for lines in chunks:
+        lines = [line.strip() for line in lines]
+        keep, header = keep_lines(lines, header, args.comment, args.blank)
+        kept = [lines[ii] for ii in keep]
+        for ii, objectives in chunk_solutions(kept, args, args.delimiter):
+            if args.print_only_objectives and args.objectives is not None:
+                row = kept[ii].split(args.delimiter)
+            else:
+                row = [kept[ii]]
+            if args.contribution:
+                row.append(tag)
+                if args.line_number:
+                    row.append(str(linenumber + keep[ii] + 1))
+            yield objectives, row
+        linenumber += len(lines)
+
+def binary_table(front, tag, args, presort=True):
+    """
+    --input-format binary version of cli_table: generator of
+    (objectives, row) tuples from a BinaryFront.  Column indices in the
+    arguments count the stored objective columns, not columns of text.
+
+    A row is the stored text of the row, or the stored objectives if there
+    isn't any or if only objectives are printed, plus any attribution,
+    with the row number for a line number.  With NumPy and presort, only
+    the rows that eps_sort_indices finds nondominated come out, as with
+    --bulk.
+    """
+    np = get_numpy()
+    stored = front.objectives()
+    columns = list(stored)
+    if args.objectives is not None:
+        columns = [columns[ii] for ii in args.objectives]
+    mindices = cli_mindices(args)
+    if mindices is None:
+        mindices = range(len(columns))
+    for ii in mindices:
+        if np is not None:
+            columns[ii] = -columns[ii]
+        else:
+            columns[ii] = array("d", [-x for x in columns[ii]])
+
+    if np is not None:
+        matrix = np.column_stack(columns) if len(columns) > 0 else \
+                 np.zeros((front.nrow, 0))
+        if presort:
+            indices = eps_sort_indices(matrix, args.epsilons)
+        else:
+            indices = np.arange(front.nrow)
+        points = matrix[indices].tolist()
+        indices = indices.tolist()
+    else:
+        points = [list(point) for point in zip(*columns)]
+        indices = range(front.nrow)
+
+    for index, objectives in zip(indices, points):
+        if not front.hastext or (args.print_only_objectives and
+                                 args.objectives is not None):
+            row = [repr(float(column[index])) for column in stored]
+        else:
+            row = [front.text(index)]
+        if args.contribution:
+            row.append(tag)
+            if args.line_number:
+                row.append(str(index + 1))
+        yield objectives, row
+
+def binary_input(fp, args):
+    """ whether to read fp as a binary front, see --input-format """
+    if args.input_format != "auto":
+        return args.input_format == "binary"
+    if not os.path.isfile(fp.name):
+        return False
+    with open(fp.name, "rb") as stream:
+        return stream.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+def read_binary(fp):
+    """ BinaryFront for an input, memory-mapped if it is a regular file """
+    if os.path.isfile(fp.name):
+        with open(fp.name, "rb") as stream:
+            return BinaryFront(map_input(stream))
+    return BinaryFront(getattr(fp, "buffer", fp).read())
+
+def mmap_table(mapping, fileid, args, size=2**24):
+    """
+    --mmap version of cli_table: generator of
+    (objectives, (fileid, offset, length)) tuples, where offset and length
+    locate the stripped line in mapping.  Lines are read from the mapping
+    a chunk at a time and parsed by chunk_solutions, as for --bulk.
+
+    mapping: mmap of an input file, or its contents as bytes
+    fileid: index of the input file
+    """
+    import locale
+    encoding = locale.getpreferredencoding(False)
+    delimiter = args.delimiter.encode(encoding)
+    comment = [commentchar.encode(encoding) for commentchar in args.comment]
+
+    header = args.header
+    start = 0
+    while start < len(mapping):
+        stop = mapping.find(b"\n", min(start + size, len(mapping)) - 1)
+        if stop < 0:
+            stop = len(mapping)
+        lines = mapping[start:stop].split(b"\n")
+        offsets = []
+        position = start
+        for ii, line in enumerate(lines):
+            stripped = line.lstrip()
+            offsets.append(position + len(line) - len(stripped))
+            lines[ii] = stripped.rstrip()
+            position += len(line) + 1
+        start = stop + 1
+
+        keep, header = keep_lines(lines, header, comment, args.blank)
+        kept = [lines[ii] for ii in keep]
+        for ii, objectives in chunk_solutions(kept, args, delimiter):
+            yield objectives, (fileid, offsets[keep[ii]], len(kept[ii]))
+
+def file_chunks(filename, nchunks):
+    """
+    split a file into at most nchunks byte ranges of at least a megabyte
+    return a list of (start, stop) tuples
+    """
+    size = os.path.getsize(filename)
+    nchunks = max(1, min(nchunks, size // 2**20))
+    step = size // nchunks + 1
+    return [(start, min(start + step, size))
+            for start in range(0, max(size, 1), step)]
+
+def byte_range_lines(stream, start, stop, count=True):
+    """
+    generator of the lines of a binary stream that start in the byte range
+    [start, stop), decoded as the stream would be in text mode
+    Yields the number of lines before the range first, then the lines.
+    count: False to skip reading everything before the range to count
+           its lines, when no line numbers are needed, and yield 0
+    """
+    import locale
+    encoding = locale.getpreferredencoding(False)
+
+    position = start
+    if start > 0:
+        # finish the line that started before the range
+        stream.seek(start - 1)
+        position = start - 1 + len(stream.readline())
+
+    # count lines before the range, reading a megabyte at a time
+    linenumber = 0
+    if count:
+        stream.seek(0)
+        remaining = position
+        while remaining > 0:
+            block = stream.read(min(remaining, 2**20))
+            linenumber += block.count(b"\n")
+            remaining -= len(block)
+    yield linenumber
+
+    while position < stop:
+        line = stream.readline()
+        if not line:
+            break
+        position += len(line)
+        yield line.decode(encoding)
+
+def sort_file_chunk(task):
+    """
+    sort the lines starting in one byte range of one file for cli --jobs,
+    in a worker process.  Return the front as (objectives, row) tuples,
+    and a SortStats if args.stats is set, or None.
+    """
+    filename, start, stop, args = task
+    stats = SortStats() if args.stats else None
+    with open(filename, "rb") as stream:
+        lines = byte_range_lines(stream, start, stop,
+                                 args.contribution and args.line_number)
+        linenumber = next(lines)
+        header = args.header if start == 0 else 0
+        if stats is not None:
+            lines = timed(lines, stats, "read")
+        if args.bulk:
+            solutions = bulk_table(line_chunks(lines), filename, args,
+                                   linenumber, header)
+        else:
+            solutions = cli_table(lines, filename, args, linenumber, header)
+        if stats is not None:
+            solutions = timed(solutions, stats, "parse")
+            stats.enter("sort")
+        front = front_solutions([solutions], args.epsilons, args.archive,
+                                args.algorithm, stats)
+        if stats is not None:
+            stats.enter(None)
+        return front, stats
+
+def worker_args(args):
+    """ command-line arguments for worker processes, without open files """
+    import argparse
+    return argparse.Namespace(**dict(
+        (key, value) for key, value in vars(args).items()
+        if key not in ("inputs", "output")))
+
+def parallel_cli_front(args, stats=None, sources=None):
+    """
+    Sort the inputs for cli --jobs.  Worker processes reopen regular
+    files by name and sort them a byte range at a time.  Anything else
+    (standard input) is sorted in this process while they work.  Then
+    the fronts are merged in input order.
+    Return the front as (objectives, row) tuples.
+
+    stats: a SortStats to add the workers' counters and timings to, so
+           its stage times are summed over processes
+    sources: a SourceCounts for the final merge, see front_solutions
+    """
+    workerargs = worker_args(args)
+    regular = [os.path.isfile(fp.name) and not binary_input(fp, args)
+               for fp in args.inputs]
+    nchunks = max(1, args.jobs // max(1, sum(regular)))
+
+    tasks = []
+    for fp, isfile in zip(args.inputs, regular):
+        if isfile:
+            tasks.extend([(fp.name, start, stop, workerargs)
+                          for start, stop in file_chunks(fp.name, nchunks)])
+
+    import multiprocessing
+    pool = multiprocessing.Pool(args.jobs)
+    try:
+        pending = pool.map_async(sort_file_chunk, tasks, 1)
+        localfronts = [front_solutions([input_table(fp, args, stats)],
+                                       args.epsilons, args.archive,
+                                       args.algorithm, stats)
+                       for fp, isfile in zip(args.inputs, regular)
+                       if not isfile]
+        chunkfronts = []
+        for front, chunkstats in pending.get():
+            chunkfronts.append(front)
+            if stats is not None:
+                stats.add(chunkstats)
+    finally:
+        pool.close()
+        pool.join()
+
+    # put the fronts back in input order
+    fronts = []
+    origins = [] # input number of each front
+    chunkfronts = iter(chunkfronts)
+    localfronts = iter(localfronts)
+    for index, fp, isfile in zip(numbers(), args.inputs, regular):
+        if isfile:
+            for _ in file_chunks(fp.name, nchunks):
+                fronts.append(next(chunkfronts))
+                origins.append(index)
+        else:
+            fronts.append(next(localfronts))
+            origins.append(index)
+
+    return merge_fronts(fronts, args.epsilons, args.archive, args.algorithm,
+                        stats, sources, origins)
+
+class FrontCache(object):
+    """
+    An on-disk cache of the fronts of input files, for sorting a set of
+    files again when only a few of them have changed.  Sorting is
+    associative, so the cached fronts of unchanged files can go straight
+    into the final merge.
+
+    Each front is pickled into a file of its own, named by its key.
+    Reading a front marks it as recently used by touching its file, and
+    trim removes the least recently used fronts until the cache fits in
+    maxbytes.  Only point it at a directory you trust, because loading
+    a pickle can run code.
+    """
+    suffix = ".front"
+
+    def __init__(self, directory, maxbytes=2**30):
+        """
+        directory: where to keep the fronts, created if need be
+        maxbytes: how much to keep after trim
+        """
+        self.directory = directory
+        self.maxbytes = maxbytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        """ filename of the front stored under key """
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """ return the front stored under key, or None if there isn't one """
+        import pickle
+        path = self.path(key)
+        try:
+            with open(path, "rb") as stream:
+                front = pickle.load(stream)
+            os.utime(path, None)
+        except (IOError, OSError, EOFError, ValueError,
+                pickle.UnpicklingError):
+            return None # missing, or damaged by an interrupted write
+        return front
+
+    def put(self, key, front):
+        """ store a front, a list of (objectives, tagalong) tuples """
+        import pickle
+        import tempfile
+        fd, temporary = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        with os.fdopen(fd, "wb") as stream:
+            pickle.dump(front, stream, pickle.HIGHEST_PROTOCOL)
+        getattr(os, "replace", os.rename)(temporary, self.path(key))
+
+    def trim(self):
+        """ remove the least recently used fronts beyond maxbytes """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.suffix):
+                path = os.path.join(self.directory, name)
+                status = os.stat(path)
+                entries.append((status.st_mtime, status.st_size, path))
+        entries.sort(reverse=True)
+        total = 0
+        for _, size, path in entries:
+            total += size
+            if total > self.maxbytes:
+                os.remove(path)
 
-    tagalongs = eps_sort_solutions(tables, args.epsilons)
+def cache_key(filename, args):
+    """
+    key for the front of one input file in a FrontCache: a hash of the
+    file's contents and of every command-line option that changes the
+    front or its rows
+    """
+    import hashlib
+    digest = hashlib.sha256()
+    with open(filename, "rb") as stream:
+        while True:
+            block = stream.read(2**20)
+            if not block:
+                break
+            digest.update(block)
+    settings = [__version__, args.objectives, args.epsilons, args.maximize,
+                args.maximize_all, args.delimiter, args.header,
+                args.comment, args.blank, args.contribution,
+                args.line_number, args.bulk, args.print_only_objectives,
+                args.input_format]
+    if args.contribution:
+        settings.append(filename)
+    digest.update(repr(settings).encode("utf-8"))
+    return digest.hexdigest()
+
+def cached_cli_front(args, stats=None, sources=None):
+    """
+    Sort the inputs for cli --cache.  The fronts of regular files are
+    looked up in the cache by cache_key, and those that aren't there are
+    sorted (in worker processes with --jobs) and stored.  Anything else
+    (standard input) is sorted every time.  Then the fronts are merged
+    in input order, counting the members from each input in sources, if
+    it's a SourceCounts.
+    Return the front as (objectives, row) tuples.
+    """
+    cache = FrontCache(args.cache, int(args.cache_size * 2**20))
+    fronts = []
+    misses = [] # (index into fronts, filename, key)
+    for fp in args.inputs:
+        if os.path.isfile(fp.name):
+            key = cache_key(fp.name, args)
+            front = cache.get(key)
+            if front is None:
+                misses.append((len(fronts), fp, key))
+        else:
+            front = front_solutions([input_table(fp, args, stats)],
+                                    args.epsilons, args.archive,
+                                    args.algorithm, stats)
+        fronts.append(front)
+
+    # binary inputs are quick to sort, so they stay in this process
+    textmisses = [miss for miss in misses if not binary_input(miss[1], args)]
+    if args.jobs > 1 and len(textmisses) > 1:
+        workerargs = worker_args(args)
+        tasks = [(fp.name, 0, os.path.getsize(fp.name), workerargs)
+                 for _, fp, _ in textmisses]
+        results = parallel_map(sort_file_chunk, tasks, args.jobs)
+        for (index, _, key), (front, chunkstats) in zip(textmisses, results):
+            fronts[index] = front
+            if stats is not None:
+                stats.add(chunkstats)
+    unsorted = [miss for miss in misses if fronts[miss[0]] is None]
+    if args.prefetch > 0:
+        tables = prefetched_tables([fp for _, fp, _ in unsorted], args, stats)
+    else:
+        tables = [input_table(fp, args, stats) for _, fp, _ in unsorted]
+    for (index, _, _), table in zip(unsorted, tables):
+        fronts[index] = front_solutions([table], args.epsilons, args.archive,
+                                        args.algorithm, stats)
+    for index, _, key in misses:
+        cache.put(key, fronts[index])
+    cache.trim()
+
+    return merge_fronts(fronts, args.epsilons, args.archive, args.algorithm,
+                        stats, sources)
+
+def spill_cli_front(args, stats=None):
+    """
+    Sort the inputs for cli --memory-limit with spill_sort.  The number
+    of solutions to hold in memory is worked out from the size of the
+    first one, see solution_bytes.
+    Return the front as (objectives, row) tuples, see spill_sort.
+    """
+    if args.prefetch > 0:
+        tables = prefetched_tables(args.inputs, args, stats)
+    else:
+        tables = [input_table(fp, args, stats) for fp in args.inputs]
+    solutions = (solution for table in tables for solution in table)
+    for first in solutions:
+        break
+    else:
+        return []
+
+    epsilons = args.epsilons
+    if epsilons is None:
+        epsilons = [1e-9] * len(first[0])
+    elif len(epsilons) != len(first[0]):
+        msg = "{0} epsilons, but {1} objectives".format(len(epsilons),
+                                                        len(first[0]))
+        raise SortParameterError(msg)
+    limit = int(args.memory_limit * 2**20) // solution_bytes(*first)
+    solutions = (solution for table in ([first], solutions)
+                 for solution in table)
+    return spill_sort(solutions, epsilons, limit, args.archive, stats=stats)
+
+def follow(stream, interval=0.5):
+    """
+    generator of lines from stream that waits for more lines at the end
+    of the stream instead of stopping, like tail -f
+    interval: seconds to wait before looking for more lines
+    """
+    partial = ""
+    while True:
+        line = stream.readline()
+        if not line:
+            time.sleep(interval)
+            continue
+        partial += line
+        if partial.endswith("\n"):
+            yield partial
+            partial = ""
 
+def write_rows(rows, args):
+    """ write output rows as configured by the command-line arguments """
     if args.print_only_objectives and args.objectives is not None:
-        for row in tagalongs:
+        for row in rows:
             obj = [row[ii] for ii in args.objectives]
             args.output.write(args.delimiter.join(obj))
             args.output.write("\n")
     else:
-        for row in tagalongs:
+        for row in rows:
             args.output.write(args.delimiter.join(row))
             args.output.write("\n")
 
+def write_binary(front, args):
+    """
+    write (objectives, row) tuples to args.output as a binary front, with
+    the text that write_rows would write for each row.  Objectives are
+    stored as they were input, not negated for maximization.  With
+    --contribution, the input and line number (or row number, for
+    binary inputs) go in int64 columns too, so they can be read without
+    parsing the text.
+    """
+    mindices = cli_mindices(args)
+    objectives = []
+    for point, _ in front:
+        point = list(point)
+        for ii in (range(len(point)) if mindices is None else mindices):
+            point[ii] = 0 - point[ii]
+        objectives.append(point)
+
+    rows = [row for _, row in front]
+    if args.print_only_objectives and args.objectives is not None:
+        texts = [args.delimiter.join([row[ii] for ii in args.objectives])
+                 for row in rows]
+    else:
+        texts = [args.delimiter.join(row) for row in rows]
+
+    sources = [fp.name for fp in args.inputs]
+    refnames = []
+    refs = None
+    if args.contribution:
+        indices = dict(reversed([(name, ii) for ii, name in
+                                 enumerate(sources)]))
+        if args.line_number:
+            refnames = ["source", "line"]
+            refs = [[indices[row[-2]], int(row[-1])] for row in rows]
+        else:
+            refnames = ["source"]
+            refs = [[indices[row[-1]]] for row in rows]
+
+    args.output.flush()
+    stream = getattr(args.output, "buffer", args.output)
+    write_front(stream, objectives, texts, refs, refnames, sources)
+
+def snapshot_cli(args, stats=None):
+    """
+    command-line interface for --snapshot-rows and --snapshot-seconds:
+    sort the inputs one batch at a time into a single archive, printing
+    the front after each batch.  With --window-rows or --window-seconds
+    the archive is a WindowArchive.
+    stats: a SortStats for --stats
+    """
+    windowed = args.window_rows > 0 or args.window_seconds > 0
+    streams = list(args.inputs)
+    if args.follow:
+        streams[-1] = follow(streams[-1])
+    if stats is not None:
+        streams = [timed(stream, stats, "read") for stream in streams]
+    tables = [cli_table(stream, fp.name, args)
+              for stream, fp in zip(streams, args.inputs)]
+    if stats is not None:
+        tables = [timed(table, stats, "parse") for table in tables]
+        stats.enter("sort")
+
+    archive = None
+    batch = []
+    rows = 0 # since the last snapshot; windows empty batch more often
+    last = time.time()
+    for table in tables:
+        for solution in table:
+            if archive is None:
+                epsilons = args.epsilons
+                if epsilons is None:
+                    epsilons = [1e-9] * len(solution[0])
+                elif len(epsilons) != len(solution[0]):
+                    msg = "{0} epsilons, but {1} objectives".format(
+                        len(epsilons), len(solution[0]))
+                    raise SortParameterError(msg)
+                if windowed:
+                    archive = WindowArchive(epsilons,
+                                            args.window_rows or None,
+                                            args.window_seconds or None)
+                else:
+                    archive = ARCHIVES[args.archive](epsilons)
+                archive.stats = stats
+            batch.append(solution)
+            rows += 1
+            if windowed and len(batch) >= 4096:
+                archive.sortinto_many(batch) # keep the window in memory
+                batch = []
+            if (args.snapshot_rows > 0 and rows == args.snapshot_rows) or \
+                    (args.snapshot_seconds and
+                     time.time() - last >= args.snapshot_seconds):
+                archive.sortinto_many(batch)
+                batch = []
+                rows = 0
+                last = time.time()
+                if args.window_seconds > 0:
+                    archive.expire()
+                if stats is not None:
+                    stats.enter("output")
+                write_rows([row for _, row in archive.snapshot()], args)
+                args.output.write("\n")
+                args.output.flush()
+                if stats is not None:
+                    stats.enter("sort")
+
+    if archive is not None and rows > 0:
+        archive.sortinto_many(batch)
+        if args.window_seconds > 0:
+            archive.expire()
+        if stats is not None:
+            stats.enter("output")
+        write_rows([row for _, row in archive.snapshot()], args)
+        args.output.write("\n")
+
+    args.output.close()
+
+def map_input(fp):
+    """
+    memory-map an input file for --mmap, or read it into memory if it
+    can't be mapped (standard input, or an empty file)
+    """
+    import mmap
+    try:
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError, mmap.error):
+        return getattr(fp, "buffer", fp).read()
+
+def mmap_cli(args, stats=None, sources=None):
+    """
+    command-line interface for --mmap: sort (file, offset, length)
+    references into a CompactArchive and copy the output rows from the
+    mapped inputs
+    stats: a SortStats for --stats.  Reading isn't timed apart from
+           parsing, because pages of the inputs are read as they're used.
+    sources: a SourceCounts for --contribution-summary
+    """
+    import locale
+    encoding = locale.getpreferredencoding(False)
+    mappings = [map_input(fp) for fp in args.inputs]
+    tables = [mmap_table(mapping, fileid, args)
+              for fileid, mapping in enumerate(mappings)]
+    if stats is not None:
+        tables = [timed(table, stats, "parse") for table in tables]
+        stats.enter("sort")
+    front = front_solutions(
+        tables, args.epsilons, lambda eps: CompactArchive(eps, refs=3),
+        args.algorithm, stats, sources)
+    refs = [ref for _, ref in front]
+    if stats is not None:
+        stats.enter("output")
+
+    # Line numbers come from counting newlines up to each offset, in order
+    # of offset, so each input is scanned at most once.
+    linenumbers = {}
+    if args.contribution and args.line_number:
+        for fileid, offset, _ in sorted(refs):
+            last, count = linenumbers.get(fileid, (0, 1))
+            count += mappings[fileid][last:offset].count(b"\n")
+            linenumbers[fileid] = (offset, count)
+            linenumbers[(fileid, offset)] = count
+
+    args.output.flush()
+    output = getattr(args.output, "buffer", None)
+    if output is None: # a text stream without a binary buffer
+        write = lambda data: args.output.write(data.decode(encoding))
+    else:
+        write = output.write
+    delimiter = args.delimiter.encode(encoding)
+    for fileid, offset, length in refs:
+        line = mappings[fileid][offset:offset + length]
+        if args.print_only_objectives and args.objectives is not None:
+            fields = line.split(delimiter)
+            write(delimiter.join([fields[ii] for ii in args.objectives]))
+            write(b"\n")
+            continue
+        write(line)
+        if args.contribution:
+            write(delimiter + args.inputs[fileid].name.encode(encoding))
+            if args.line_number:
+                write(delimiter +
+                      str(linenumbers[(fileid, offset)]).encode(encoding))
+        write(b"\n")
+
+    args.output.close()
+
+    if args.metrics is not None:
+        if stats is not None:
+            stats.enter("metrics")
+        metrics_cli(front, args)
+
+    if sources is not None:
+        sources.report(sys.stderr)
+
+def ranks_cli(args):
+    """
+    command-line interface for --ranks: write the rows of the first
+    args.ranks fronts, in order of rank and then of input, each with its
+    rank as an extra column
+    """
+    solutions = []
+    for fp in args.inputs:
+        if binary_input(fp, args):
+            table = binary_table(read_binary(fp), fp.name, args, False)
+        else:
+            table = cli_table(fp, fp.name, args)
+        solutions.extend(table)
+    epsilons = args.epsilons
+    if epsilons is None and len(solutions) > 0:
+        epsilons = [1e-9] * len(solutions[0][0])
+    ranks = box_ranks([objectives for objectives, _ in solutions],
+                      epsilons or [], args.ranks)
+
+    ranked = sorted([(rank, ii) for ii, rank in enumerate(ranks)
+                     if rank is not None])
+    for rank, ii in ranked:
+        row = solutions[ii][1]
+        if args.print_only_objectives and args.objectives is not None:
+            row = [row[oo] for oo in args.objectives]
+        args.output.write(args.delimiter.join(row + [str(rank)]))
+        args.output.write("\n")
+
     args.output.close()
 
+def target_cli_front(args, stats=None):
+    """
+    Sort the inputs for cli --target-size with target_front, and report
+    the epsilons it settled on.
+    Return the front as (objectives, row) tuples.
+    """
+    solutions = []
+    for fp in args.inputs:
+        if binary_input(fp, args):
+            table = binary_table(read_binary(fp), fp.name, args, False)
+        else:
+            table = cli_table(fp, fp.name, args)
+        solutions.extend(table)
+    front, epsilons = target_front(solutions, args.target_size,
+                                   args.epsilons, args.archive,
+                                   args.algorithm, stats)
+    if epsilons is not None:
+        sys.stderr.write("epsilons {0}\n".format(
+            " ".join([repr(epsilon) for epsilon in epsilons])))
+    if len(front) > args.target_size:
+        sys.stderr.write("no epsilons give a front of {0} rows or fewer, "
+                         "the smallest has {1}\n".format(args.target_size,
+                                                         len(front)))
+    return front
+
+def metrics_cli(front, args):
+    """
+    command-line interface for --metrics: write quality metrics of the
+    front, (objectives, row) tuples, to standard error
+    """
+    reference = args.reference_point
+    if reference is not None:
+        reference = list(reference)
+        mindices = cli_mindices(args)
+        for ii in (range(len(reference)) if mindices is None else mindices):
+            reference[ii] = 0 - reference[ii]
+    targets = None
+    if args.reference_set is not None:
+        fp = args.reference_set
+        targets = [objectives for objectives, _ in
+                   cli_table(fp, fp.name, args)]
+    metrics = point_metrics([objectives for objectives, _ in front],
+                            reference, targets, args.metrics or None,
+                            samples=args.samples)
+    for name, value in metrics.items():
+        sys.stderr.write("{0:<20}{1}\n".format(name, value))
+
+def input_table(fp, args, stats=None, stream=None):
+    """
+    (objectives, row) tuples from an input file, see cli_table
+    stats: a SortStats to time reading and parsing in
+    stream: text stream to read instead of fp, for example a
+            PrefetchStream
+    """
+    if binary_input(fp, args):
+        table = binary_table(read_binary(fp), fp.name, args)
+        return table if stats is None else timed(table, stats, "parse")
+    if stream is None:
+        stream = fp
+    if stats is None:
+        if args.bulk:
+            return bulk_table(stream_chunks(stream), fp.name, args)
+        return cli_table(stream, fp.name, args)
+    if args.bulk:
+        chunks = timed(stream_chunks(stream), stats, "read", len)
+        table = bulk_table(chunks, fp.name, args)
+    else:
+        table = cli_table(timed(stream, stats, "read"), fp.name, args)
+    return timed(table, stats, "parse")
+
+class PrefetchStream(object):
+    """
+    A text stream over blocks of an input read ahead by a background
+    thread, see prefetch.  It holds at most a fixed number of blocks, so
+    the thread waits for the stream to be read before it reads further.
+    Supports read(size) and iteration over lines, which is all that
+    input_table needs.
+    """
+    def __init__(self, blocks):
+        """ blocks: most blocks to hold that haven't been read """
+        import queue
+        self.queue = queue.Queue(blocks)
+        self.buffer = ""
+        self.done = False
+        self.closed = False
+
+    def fill(self, read, fp, size):
+        """
+        put blocks of read(fp, size) in the queue until it returns
+        nothing, then an empty block; for the background thread.  If
+        read raises an exception, put that instead, for the reader to
+        raise.
+        """
+        while not self.closed:
+            try:
+                block = read(fp, size)
+            except Exception as error:
+                self.queue.put(error)
+                break
+            self.queue.put(block)
+            if not block:
+                break
+
+    def get(self):
+        """ the next block from the queue, raising what read raised """
+        block = self.queue.get()
+        if isinstance(block, Exception):
+            self.done = True
+            raise block
+        return block
+
+    def close(self):
+        """ stop the background thread, dropping anything unread """
+        import queue
+        self.closed = True
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def more(self):
+        """ move the next block into the buffer, False at the end """
+        if not self.done:
+            block = self.get()
+            self.done = not block
+            self.buffer += block
+        return not self.done
+
+    def read(self, size=-1):
+        """ up to size characters, or everything left if size < 0 """
+        parts = [self.buffer]
+        length = len(self.buffer)
+        while (size < 0 or length < size) and not self.done:
+            block = self.get()
+            self.done = not block
+            parts.append(block)
+            length += len(block)
+        text = "".join(parts)
+        if size < 0:
+            size = len(text)
+        self.buffer = text[size:]
+        return text[:size]
+
+    def __iter__(self):
+        start = 0
+        while True:
+            stop = self.buffer.find("\n", start) + 1
+            if stop > 0:
+                yield self.buffer[start:stop]
+                start = stop
+                continue
+            self.buffer = self.buffer[start:]
+            start = 0
+            if not self.more():
+                break
+        if self.buffer:
+            yield self.buffer
+            self.buffer = ""
+
+def prefetch(inputs, depth, read, size=2**20, blocks=16):
+    """
+    generator of a PrefetchStream for each of inputs, in order, while
+    background threads read ahead in it and in up to depth more.
+    Threads only help with waiting for I/O, because parsing holds the
+    interpreter lock, so read(fp, size) should return the next size
+    characters of fp, or nothing at the end, without parsing them.  Each
+    stream holds at most blocks blocks, so at most about
+    (depth + 1) * blocks * size characters are held at once.
+    """
+    import threading
+    streams = []
+    try:
+        for fp in inputs:
+            stream = PrefetchStream(blocks)
+            thread = threading.Thread(target=stream.fill,
+                                      args=(read, fp, size))
+            thread.daemon = True
+            thread.start()
+            streams.append(stream)
+            if len(streams) > depth:
+                yield streams.pop(0)
+        while streams:
+            yield streams.pop(0)
+    finally:
+        for stream in streams:
+            stream.close()
+
+def prefetched_tables(inputs, args, stats=None):
+    """
+    tables of (objectives, row) tuples for inputs, like input_table, but
+    with each text input, and up to args.prefetch upcoming text inputs,
+    read ahead by prefetch while earlier ones are sorted.  Return a list
+    of generators, which must be used in order.
+    """
+    binaries = [binary_input(fp, args) for fp in inputs] # mapped, not read
+    streams = prefetch([fp for fp, binary in zip(inputs, binaries)
+                        if not binary],
+                       args.prefetch, lambda fp, size: fp.read(size))
+
+    def table(fp, binary):
+        stream = None if binary else next(streams)
+        for solution in input_table(fp, args, stats, stream):
+            yield solution
+
+    return [table(fp, binary) for fp, binary in zip(inputs, binaries)]
+
+def cli(args):
+    """ command-line interface, execute the comparison """
+    stats = SortStats() if args.stats else None
+    sources = None
+    if args.contribution_summary:
+        sources = SourceCounts([fp.name for fp in args.inputs])
+
+    if args.ranks > 0:
+        ranks_cli(args)
+    elif args.snapshot_rows > 0 or args.snapshot_seconds > 0 or \
+            args.follow or args.window_rows > 0 or args.window_seconds > 0:
+        snapshot_cli(args, stats)
+    elif args.mmap:
+        mmap_cli(args, stats, sources)
+    else:
+        if stats is not None:
+            stats.enter("sort")
+        if args.cache is not None:
+            front = cached_cli_front(args, stats, sources)
+        elif args.target_size > 0:
+            front = target_cli_front(args, stats)
+        elif args.memory_limit > 0:
+            front = spill_cli_front(args, stats)
+        elif args.jobs > 1:
+            front = parallel_cli_front(args, stats, sources)
+        else:
+            if args.prefetch > 0:
+                tables = prefetched_tables(args.inputs, args, stats)
+            else:
+                tables = [input_table(fp, args, stats) for fp in args.inputs]
+            front = front_solutions(tables, args.epsilons, args.archive,
+                                    args.algorithm, stats, sources)
+        if stats is not None:
+            stats.enter("output")
+
+        if args.output_format == "binary":
+            write_binary(front, args)
+        else:
+            write_rows((row for _, row in front), args)
+
+        args.output.close()
+
+        if args.metrics is not None:
+            if stats is not None:
+                stats.enter("metrics")
+            metrics_cli(front, args)
+
+        if sources is not None:
+            sources.report(sys.stderr)
+
+    if stats is not None:
+        stats.enter(None)
+        stats.report(sys.stderr)
+
+class ServerOutput(object):
+    """
+    standard output and standard error for one request to serve, kept
+    in memory so they can be sent back with the exit status.  cli
+    closes its output when it's done, so closing only flushes.
+    """
+    def __init__(self):
+        import io
+        class Unclosed(io.BytesIO):
+            def close(self):
+                pass
+        self.out = Unclosed()
+        self.stdout = io.TextIOWrapper(self.out, write_through=True)
+        self.stderr = io.StringIO()
+
+def serve_request(request, prog="pareto.py"):
+    """
+    Run one command line for serve.
+
+    request: dict with "argv", the command-line arguments without the
+             program name, and optionally "cwd", the directory to resolve
+             filenames in, and "stdin", text to read for the input "-"
+    Return (status, stderr text, output bytes).
+    """
+    import io
+    output = ServerOutput()
+    saved = sys.stdin, sys.stdout, sys.stderr, os.getcwd()
+    sys.stdin = io.StringIO(request.get("stdin") or "")
+    sys.stdin.name = "<stdin>"
+    sys.stdout, sys.stderr = output.stdout, output.stderr
+    status = 0
+    try:
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        cli(get_args([prog] + list(request["argv"])))
+    except SystemExit as exit: # from argparse
+        status = exit.code if isinstance(exit.code, int) else 1
+    except Exception as error:
+        sys.stderr.write("{0}: {1}\n".format(type(error).__name__, error))
+        status = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr, cwd = saved
+        os.chdir(cwd)
+    output.stdout.flush()
+    return status, output.stderr.getvalue(), output.out.getvalue()
+
+def serve(path, prog="pareto.py"):
+    """
+    Sort on behalf of clients on a Unix socket at path, one request at a
+    time, until interrupted.  A long-lived process pays for starting
+    Python, parsing this module and importing NumPy only once, which
+    matters when pareto.py is run many times on small files.
+
+    Each connection carries one request: a line of JSON, see
+    serve_request.  The response is a line of JSON with "status" and
+    "stderr", and then whatever cli would have written to standard
+    output.  Filenames are opened by the server, so they should be
+    absolute or come with "cwd".  See request for a client.
+    """
+    import json
+    import signal
+    import socket
+    import stat
+    def terminate(signum, frame):
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, terminate)
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.remove(path) # left behind by a server that was killed
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(16)
+    try:
+        while True:
+            connection, _ = listener.accept()
+            try:
+                stream = connection.makefile("rb")
+                line = stream.readline()
+                stream.close()
+                try:
+                    message = json.loads(line.decode("utf-8"))
+                except ValueError as error:
+                    status, stderr, out = 2, "bad request: {0}\n".format(
+                        error), b""
+                else:
+                    status, stderr, out = serve_request(message, prog)
+                header = json.dumps({"status": status, "stderr": stderr})
+                connection.sendall(header.encode("utf-8") + b"\n" + out)
+            except (IOError, OSError):
+                pass # the client went away
+            finally:
+                connection.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        os.remove(path)
+
+def request(path, argv, stdin=None, cwd=None):
+    """
+    Send a command line to a pareto.py server (see serve) on the Unix
+    socket at path.
+
+    argv: command-line arguments, without the program name
+    stdin: text for the input "-", if there is one
+    cwd: directory for the server to resolve filenames in, default to
+         this process's working directory
+    Return (status, stderr text, output bytes).
+    """
+    import json
+    import socket
+    message = {"argv": list(argv), "cwd": cwd or os.getcwd()}
+    if stdin is not None:
+        message["stdin"] = stdin
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+        connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        stream = connection.makefile("rb")
+        header = json.loads(stream.readline().decode("utf-8"))
+        out = stream.read()
+        stream.close()
+    finally:
+        connection.close()
+    return header["status"], header["stderr"], out
+
+def main(argv):
+    """
+    Run the command line.  Two forms skip building the argument parser:
+        pareto.py --serve SOCKET
+    runs a server on a Unix socket (see serve), and
+        pareto.py --connect SOCKET [arguments...]
+    has that server sort the arguments, as if they had been given to
+    pareto.py directly, and writes what it returns.
+    """
+    if len(argv) == 3 and argv[1] == "--serve":
+        serve(argv[2], argv[0])
+    elif len(argv) >= 3 and argv[1] == "--connect":
+        arguments = argv[3:]
+        stdin = sys.stdin.read() if "-" in arguments else None
+        status, stderr, out = request(argv[2], arguments, stdin)
+        sys.stderr.write(stderr)
+        getattr(sys.stdout, "buffer", sys.stdout).write(out)
+        sys.stdout.flush()
+        sys.exit(status)
+    else:
+        cli(get_args(argv))
+
 if __name__ == "__main__":
-    cli(get_args(sys.argv))
+    main(sys.argv)
@@ -0,0 +1,780 @@
+"""
+Regression tests for pareto.py
+
+    python -m unittest test_pareto
+"""
+import os
+import sys
+import math
+import random
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+import pareto
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def run_cli(*argv):
+    """ run pareto.py with argv, return (exit status, stdout, stderr) """
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "pareto.py")] + list(argv),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    out, err = proc.communicate()
+    return proc.returncode, out, err
+
+class TempFileCase(unittest.TestCase):
+    """ a test case with a scratch directory """
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w") as fp:
+            fp.write(text)
+        return path
+
+class TestBulkBlankLines(TempFileCase):
+    """ a blank line must not shift rows against lines with --bulk, --mmap """
+    text = "0.1 0.9 a\n\n0.9 0.1 b\n0.5 0.5 c\n"
+
+    def test_bulk_blank_line_fails(self):
+        path = self.write("blank.txt", self.text)
+        status, out, err = run_cli(path, "-o", "0-1", "--bulk")
+        self.assertNotEqual(status, 0)
+        self.assertIn("ValueError", err)
+        self.assertEqual(out, "")
+
+    def test_bulk_blank_line_skipped(self):
+        path = self.write("blank.txt", self.text)
+        status, out, _ = run_cli(path, "-o", "0-1", "--bulk", "--blank")
+        self.assertEqual(status, 0)
+        self.assertEqual(out.splitlines(),
+                         ["0.1 0.9 a", "0.9 0.1 b", "0.5 0.5 c"])
+
+    def test_mmap_blank_line_fails(self):
+        path = self.write("blank.txt", self.text)
+        status, out, err = run_cli(path, "-o", "0-1", "--mmap")
+        self.assertNotEqual(status, 0)
+        self.assertIn("ValueError", err)
+        self.assertEqual(out, "")
+
+    def test_mmap_blank_line_skipped(self):
+        path = self.write("blank.txt", self.text)
+        status, out, _ = run_cli(path, "-o", "0-1", "--mmap", "--blank")
+        self.assertEqual(status, 0)
+        self.assertEqual(out.splitlines(),
+                         ["0.1 0.9 a", "0.9 0.1 b", "0.5 0.5 c"])
+
+class TestUnsupportedCombinations(TempFileCase):
+    """ options that a mode can't honour are errors, not ignored """
+    def assert_rejected(self, *argv):
+        path = self.write("front.txt", "0.1 0.9\n0.9 0.1\n")
+        status, out, err = run_cli(path, *argv)
+        self.assertEqual(status, 2, err)
+        self.assertIn("not supported", err)
+
+    def test_binary_output(self):
+        for mode in (["--ranks", "2"], ["--mmap"], ["--snapshot-rows", "1"],
+                     ["--window-rows", "1"]):
+            self.assert_rejected("--output-format", "binary", *mode)
+
+    def test_contribution_summary(self):
+        for mode in (["--ranks", "2"], ["--target-size", "1"],
+                     ["--memory-limit", "1"], ["--snapshot-rows", "1"]):
+            self.assert_rejected("--contribution-summary", *mode)
+
+    def test_metrics(self):
+        for mode in (["--ranks", "2"], ["--snapshot-rows", "1"]):
+            self.assert_rejected("--metrics", "--reference-point", "2", "2",
+                                 *mode)
+
+    def test_prefetch(self):
+        for mode in (["--jobs", "2"], ["--mmap"], ["--ranks", "2"]):
+            self.assert_rejected("--prefetch", "1", *mode)
+
+    def test_ignored_options(self):
+        for option, modes in (
+                (["--jobs", "2"], (["--ranks", "2"], ["--mmap"],
+                                   ["--snapshot-rows", "1"],
+                                   ["--target-size", "1"],
+                                   ["--memory-limit", "1"])),
+                (["--algorithm", "kung"], (["--ranks", "2"],
+                                           ["--window-rows", "1"],
+                                           ["--memory-limit", "1"])),
+                (["--archive", "list"], (["--mmap"], ["--ranks", "2"],
+                                         ["--window-rows", "1"])),
+                (["--bulk"], (["--mmap"], ["--follow", "--snapshot-rows", "1"],
+                              ["--target-size", "1"])),
+                (["--cache", self.tmpdir], (["--mmap"], ["--ranks", "2"])),
+                (["--memory-limit", "1"], (["--target-size", "1"],))):
+            for mode in modes:
+                self.assert_rejected(*(option + mode))
+
+    def test_follow_without_snapshots(self):
+        path = self.write("front.txt", "0.1 0.9\n")
+        for argv in (["--follow"], ["--follow", "--window-rows", "5"]):
+            status, _, err = run_cli(path, *argv)
+            self.assertEqual(status, 2, err)
+            self.assertIn("--follow needs", err)
+
+    def test_honoured_options(self):
+        path = self.write("front.txt", "0.1 0.9\n0.9 0.1\n")
+        for argv in (["--archive", "list", "--snapshot-rows", "1"],
+                     ["--algorithm", "grid", "--mmap"],
+                     ["--bulk", "--memory-limit", "1"],
+                     ["--algorithm", "kung", "--target-size", "1"]):
+            status, _, err = run_cli(path, *argv)
+            self.assertEqual(status, 0, err)
+
+class TestMmapMetrics(TempFileCase):
+    """ --mmap reports the same metrics as the usual path """
+    def test_hypervolume(self):
+        path = self.write("front.txt", "0.1 0.9\n0.5 0.5\n0.9 0.1\n")
+        argv = ["--metrics", "--reference-point", "2", "2"]
+        _, _, expected = run_cli(path, *argv)
+        status, _, err = run_cli(path, "--mmap", *argv)
+        self.assertEqual(status, 0, err)
+        self.assertIn("hypervolume", err)
+        self.assertEqual(err, expected)
+
+class TestPrefetch(TempFileCase):
+    """ reading ahead in bounded blocks gives the same output """
+    def test_blocks(self):
+        rows = ["{0} {1} {2}".format(ii % 7, (ii * 3) % 11, ii)
+                for ii in range(1000)]
+        paths = [self.write("in{0}.txt".format(ii),
+                            "\n".join(rows[ii::3]) + "\n")
+                 for ii in range(3)]
+        for extra in ([], ["--bulk"], ["--memory-limit", "0.001"]):
+            argv = paths + ["-o", "0", "1", "--contribution"] + extra
+            _, expected, _ = run_cli(*argv)
+            status, out, err = run_cli(*(argv + ["--prefetch", "2"]))
+            self.assertEqual(status, 0, err)
+            self.assertEqual(out, expected)
+
+    def test_stream(self):
+        text = "".join(["line {0}\n".format(ii) for ii in range(100)])
+        fp = self.write("lines.txt", text + "last")
+        with open(fp) as stream:
+            streams = pareto.prefetch([stream], 1,
+                                      lambda fp, size: fp.read(size),
+                                      size=7, blocks=2)
+            self.assertEqual(list(next(streams)),
+                             text.splitlines(True) + ["last"])
+        with open(fp) as stream:
+            prefetched = next(pareto.prefetch(
+                [stream], 0, lambda fp, size: fp.read(size), size=5,
+                blocks=1))
+            self.assertEqual(prefetched.read(12), text[:12])
+            self.assertEqual(prefetched.read(), text[12:] + "last")
+            self.assertEqual(prefetched.read(3), "")
+
+    def test_read_error(self):
+        def read(fp, size):
+            raise IOError("unreadable")
+        stream = next(pareto.prefetch(["input"], 1, read))
+        self.assertRaises(IOError, stream.read)
+        stream = next(pareto.prefetch(["input"], 1, read))
+        self.assertRaises(IOError, list, stream)
+
+    def test_invalid_text(self):
+        path = os.path.join(self.tmpdir, "bad.txt")
+        with open(path, "wb") as fp:
+            fp.write(b"0.1 0.2\n\xff\xfe 1\n")
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "pareto.py"), path,
+             "--prefetch", "1"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            env=dict(os.environ, PYTHONUTF8="1")) # so it can't be decoded
+        try:
+            _, err = proc.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            self.fail("--prefetch hung on an input it can't decode")
+        self.assertNotEqual(proc.returncode, 0)
+        self.assertIn(b"UnicodeDecodeError", err)
+
+class TestContributionSummary(TempFileCase):
+    """ --mmap counts the same members by input as the usual path """
+    def test_mmap(self):
+        first = self.write("first.txt", "0.1 0.9\n0.5 0.5\n0.9 0.9\n")
+        second = self.write("second.txt", "0.9 0.1\n0.4 0.4\n")
+        _, _, expected = run_cli(first, second, "--contribution-summary")
+        status, _, err = run_cli(first, second, "--contribution-summary",
+                                 "--mmap")
+        self.assertEqual(status, 0, err)
+        self.assertEqual(err, expected)
+        self.assertIn("total", err)
+
+class TestSnapshots(TempFileCase):
+    """ snapshots come every --snapshot-rows rows, however windows flush """
+    def snapshots(self, *argv):
+        rows = ["{0} {1} {2}".format(ii % 97, 96 - ii % 97 + ii * 1e-4, ii)
+                for ii in range(10000)]
+        path = self.write("rows.txt", "\n".join(rows) + "\n")
+        status, out, err = run_cli(path, "-o", "0", "1", *argv)
+        self.assertEqual(status, 0, err)
+        fronts = out.split("\n\n")
+        self.assertEqual(fronts.pop(), "")
+        return rows, [front.splitlines() for front in fronts]
+
+    def test_window_without_snapshot_rows(self):
+        rows, fronts = self.snapshots("--window-rows", "100")
+        self.assertEqual(len(fronts), 1)
+        expected = pareto.eps_sort([[row.split() for row in rows[-100:]]],
+                                   [0, 1])
+        self.assertEqual(fronts[0], [" ".join(row) for row in expected])
+
+    def test_window_with_snapshot_rows(self):
+        self.assertEqual(len(self.snapshots("--window-rows", "100",
+                                            "--snapshot-rows", "5000")[1]), 2)
+        self.assertEqual(len(self.snapshots("--window-rows", "100",
+                                            "--snapshot-rows", "3000")[1]), 4)
+
+    def test_snapshot_rows(self):
+        self.assertEqual(len(self.snapshots("--snapshot-rows", "2500")[1]),
+                         4)
+
+class TestTargetSize(unittest.TestCase):
+    """ eps_target when no epsilons reach the target """
+    def test_unreachable(self):
+        rows, epsilons = pareto.eps_target([[[-1, 1], [1, -1]]], 1)
+        self.assertEqual(rows, [[-1, 1], [1, -1]])
+        for epsilon in epsilons:
+            self.assertTrue(0 < epsilon < float("inf"))
+
+    def test_reachable(self):
+        rows, _ = pareto.eps_target([[[0.1, 0.9], [0.9, 0.1], [0.5, 0.5]]],
+                                    1)
+        self.assertEqual(rows, [[0.5, 0.5]])
+
+STATS = ("candidates", "comparisons", "nondominated", "dominated",
+         "dominates", "samebox", "evictions", "peak")
+
+def tie_solutions(seed, nrow, nobj):
+    """
+    (objectives, tagalong) tuples near the unit sphere, rounded to a
+    coarse grid so that many share epsilon boxes (at epsilon 0.1) and
+    some are exact duplicates
+    """
+    rng = random.Random(seed)
+    solutions = []
+    for ii in range(nrow):
+        if solutions and rng.random() < 0.1:
+            objectives = list(rng.choice(solutions)[0])
+        else:
+            point = [abs(rng.gauss(0, 1)) for _ in range(nobj)]
+            norm = sum([x * x for x in point]) ** 0.5 or 1.0
+            objectives = [round((x / norm + 0.2 * rng.random()) * 40) / 40
+                          for x in point]
+        solutions.append((objectives, ii))
+    return solutions
+
+def sorted_into(archive, solutions):
+    """ the front and SortStats of sorting solutions into archive """
+    archive.stats = pareto.SortStats()
+    for objectives, tagalong in solutions:
+        archive.sortinto(objectives, tagalong)
+    front = [(list(objectives), tagalong)
+             for objectives, tagalong in archive.snapshot()]
+    stats = [getattr(archive.stats, name) for name in STATS]
+    return front, stats
+
+def outcomes(result):
+    """
+    the front and the SortStats that don't depend on how many members
+    the archive compares a candidate with
+    """
+    front, stats = result
+    return front, [count for name, count in zip(STATS, stats)
+                   if name not in ("comparisons", "nondominated")]
+
+def shifted(solutions, offset):
+    """ solutions with offset added to every objective """
+    return [([x + offset for x in objectives], tagalong)
+            for objectives, tagalong in solutions]
+
+class TestBoxArchive(unittest.TestCase):
+    """
+    BoxArchive gives the same front, in the same order, as Archive, with
+    the same outcomes but fewer comparisons
+    """
+    def check(self, seed, nrow, nobj):
+        for offset in (0.0, -0.5):
+            solutions = shifted(tie_solutions(seed, nrow, nobj), offset)
+            epsilons = [0.1 * (ii + 1) for ii in range(nobj)]
+            expected = sorted_into(pareto.Archive(epsilons), solutions)
+            got = sorted_into(pareto.BoxArchive(epsilons), solutions)
+            self.assertEqual(outcomes(got), outcomes(expected))
+            self.assertTrue(got[1][1] <= expected[1][1])
+
+    def test_small(self):
+        for seed in range(20):
+            for nobj in (2, 3):
+                self.check(seed, 200, nobj)
+
+    def test_objectives(self):
+        for nobj in range(1, 6):
+            self.check(nobj, 2000, nobj)
+
+def dominated_box(box, boxes):
+    """ whether some other box in boxes is at least as good everywhere """
+    return any([other != box and all([a <= b for a, b in zip(other, box)])
+                for other in boxes])
+
+class TestKungSort(unittest.TestCase):
+    """
+    kung_sort gives the same front, in the same order, as Archive, and
+    kung_front the same boxes as comparing every pair
+    """
+    def check(self, seed, nrow, nobj):
+        for offset in (0.0, -0.5):
+            solutions = shifted(tie_solutions(seed, nrow, nobj), offset)
+            epsilons = [0.1 * (ii + 1) for ii in range(nobj)]
+            expected, _ = sorted_into(pareto.Archive(epsilons), solutions)
+            got = pareto.kung_sort(iter(solutions), epsilons)
+            self.assertEqual(got, expected)
+            tables = [iter(solutions[:nrow // 3]),
+                      iter(solutions[nrow // 3:])]
+            got = pareto.front_solutions(tables, epsilons, algorithm="kung")
+            self.assertEqual(got, expected)
+
+    def test_small(self):
+        for seed in range(20):
+            for nobj in (2, 3):
+                self.check(seed, 200, nobj)
+
+    def test_objectives(self):
+        for nobj in range(1, 6):
+            self.check(nobj, 2000, nobj)
+
+    def test_kung_front(self):
+        for nobj in range(1, 6):
+            rng = random.Random(nobj)
+            boxes = sorted(set([tuple([rng.randint(0, 5)
+                                       for _ in range(nobj)])
+                                for _ in range(300)]))
+            expected = [box for box in boxes
+                        if not dominated_box(box, boxes)]
+            self.assertEqual(pareto.kung_front(boxes), expected)
+
+class TestCompactArchive(unittest.TestCase):
+    """
+    CompactArchive in pure Python gives the same front, in the same order,
+    with the same SortStats, as Archive, also with refs and when it
+    squeezes out dead slots.  Comparing with NumPy gives the same front
+    and outcomes.
+    """
+    def check(self, seed, nrow, nobj):
+        for offset in (0.0, -0.5):
+            solutions = shifted(tie_solutions(seed, nrow, nobj), offset)
+            epsilons = [0.1 * (ii + 1) for ii in range(nobj)]
+            expected = sorted_into(pareto.Archive(epsilons), solutions)
+
+            python = pareto.CompactArchive(epsilons)
+            python.kernel = None
+            python.numpy = None
+            self.assertEqual(sorted_into(python, solutions), expected)
+
+            refs = pareto.CompactArchive(epsilons, refs=1)
+            refs.kernel = None
+            refs.numpy = None
+            self.assertEqual(sorted_into(refs, solutions), expected)
+
+            pairs = [(objectives, (tagalong, -tagalong))
+                     for objectives, tagalong in solutions]
+            paired = pareto.CompactArchive(epsilons, refs=2)
+            paired.kernel = None
+            paired.numpy = None
+            self.assertEqual(sorted_into(paired, pairs),
+                             sorted_into(pareto.Archive(epsilons), pairs))
+
+            if pareto.get_numpy() is not None:
+                vector = pareto.CompactArchive(epsilons)
+                vector.kernel = None
+                vector.vectorsize = 1
+                self.assertEqual(outcomes(sorted_into(vector, solutions)),
+                                 outcomes(expected))
+
+    def test_small(self):
+        for seed in range(20):
+            for nobj in (2, 3):
+                self.check(seed, 200, nobj)
+
+    def test_objectives(self):
+        for nobj in range(1, 6):
+            self.check(nobj, 2000, nobj)
+
+class TestGridSort(unittest.TestCase):
+    """
+    front_solutions(algorithm="grid") gives the same front, in the same
+    order, and the same counts by source, as Archive, and box_winners
+    keeps the solution that wins each box in an Archive
+    """
+    def check(self, seed, nrow, nobj):
+        for offset in (0.0, -0.5):
+            solutions = shifted(tie_solutions(seed, nrow, nobj), offset)
+            epsilons = [0.1 * (ii + 1) for ii in range(nobj)]
+            expected, _ = sorted_into(pareto.Archive(epsilons), solutions)
+            cuts = [0, nrow // 5, nrow // 2, nrow]
+            origin = dict((tagalong, ii) for ii in range(3)
+                          for _, tagalong in solutions[cuts[ii]:cuts[ii + 1]])
+            counts = [0, 0, 0]
+            for _, tagalong in expected:
+                counts[origin[tagalong]] += 1
+            for archive in sorted(pareto.ARCHIVES):
+                tables = [iter(solutions[cuts[ii]:cuts[ii + 1]])
+                          for ii in range(3)]
+                sources = pareto.SourceCounts(["a", "b", "c"])
+                stats = pareto.SortStats()
+                got = pareto.front_solutions(tables, epsilons, archive,
+                                             "grid", stats, sources)
+                self.assertEqual([(list(objectives), tagalong)
+                                  for objectives, tagalong in got], expected)
+                self.assertEqual(sources.counts, counts)
+                self.assertTrue(stats.samebox == 0)
+
+            winners = pareto.box_winners(iter(solutions), epsilons)
+            inbox = {}
+            for objectives, tagalong in solutions:
+                ebox = tuple([math.floor(x / eps)
+                              for x, eps in zip(objectives, epsilons)])
+                inbox.setdefault(ebox, []).append((objectives, tagalong))
+            self.assertEqual(sorted(winners), sorted(inbox))
+            for ebox, members in inbox.items():
+                front, _ = sorted_into(pareto.Archive(epsilons), members)
+                self.assertEqual(front, [tuple(winners[ebox][2:])])
+
+    def test_small(self):
+        for seed in range(20):
+            for nobj in (2, 3):
+                self.check(seed, 200, nobj)
+
+    def test_objectives(self):
+        for nobj in range(1, 6):
+            self.check(nobj, 2000, nobj)
+
+class TestPresort(unittest.TestCase):
+    """
+    front_solutions with presort gives the same front, in the same order,
+    and the same counts by source, as Archive, and evicts fewer members
+    when the input comes worst first
+    """
+    def check(self, seed, nrow, nobj):
+        for offset in (0.0, -0.5):
+            solutions = shifted(tie_solutions(seed, nrow, nobj), offset)
+            epsilons = [0.1 * (ii + 1) for ii in range(nobj)]
+            expected, _ = sorted_into(pareto.Archive(epsilons), solutions)
+            half = nrow // 2
+            counts = [len([tagalong for _, tagalong in expected
+                           if tagalong < half]),
+                      len([tagalong for _, tagalong in expected
+                           if tagalong >= half])]
+            for presort in pareto.PRESORTS:
+                for archive in sorted(pareto.ARCHIVES):
+                    sources = pareto.SourceCounts(["a", "b"])
+                    stats = pareto.SortStats()
+                    got = pareto.front_solutions(
+                        [iter(solutions[:half]), iter(solutions[half:])],
+                        epsilons, archive, stats=stats, sources=sources,
+                        presort=presort)
+                    self.assertEqual([(list(objectives), tagalong)
+                                      for objectives, tagalong in got],
+                                     expected)
+                    self.assertEqual(sources.counts, counts)
+                    self.assertTrue(stats.evictions <= stats.samebox)
+
+            worst = sorted(solutions, key=lambda solution: -sum(solution[0]))
+            expected, stats = sorted_into(pareto.Archive(epsilons), worst)
+            evictions = stats[STATS.index("evictions")]
+            for presort in pareto.PRESORTS:
+                stats = pareto.SortStats()
+                got = pareto.front_solutions([iter(worst)], epsilons,
+                                             stats=stats, presort=presort)
+                self.assertEqual([(list(objectives), tagalong)
+                                  for objectives, tagalong in got], expected)
+                self.assertTrue(stats.evictions < evictions)
+
+    def test_small(self):
+        for seed in range(20):
+            for nobj in (2, 3):
+                self.check(seed, 200, nobj)
+
+    def test_objectives(self):
+        for nobj in range(1, 6):
+            self.check(nobj, 2000, nobj)
+
+def cell_volume(points, reference):
+    """
+    hypervolume by adding up the cells of the grid through every
+    coordinate that some point dominates
+    """
+    points = [point for point in points
+              if all([x < rr for x, rr in zip(point, reference)])]
+    grids = [sorted(set([point[ii] for point in points] + [reference[ii]]))
+             for ii in range(len(reference))]
+    cells = [[]]
+    for grid in grids:
+        cells = [cell + [ii] for cell in cells for ii in range(len(grid) - 1)]
+    volume = 0.0
+    for cell in cells:
+        low = [grid[ii] for grid, ii in zip(grids, cell)]
+        if any([all([x <= ll for x, ll in zip(point, low)])
+                for point in points]):
+            size = 1.0
+            for grid, ii in zip(grids, cell):
+                size *= grid[ii + 1] - grid[ii]
+            volume += size
+    return volume
+
+class TestMetrics(unittest.TestCase):
+    """
+    hypervolume agrees with adding up grid cells, and its estimate comes
+    close.  The front an Archive keeps is within an epsilon of every
+    solution, and the epsilon indicator and generational distance agree
+    with their definitions.
+    """
+    def check(self, seed, nrow, nobj):
+        solutions = tie_solutions(seed, nrow, nobj)
+        epsilons = [0.1 * (ii + 1) for ii in range(nobj)]
+        front, _ = sorted_into(pareto.Archive(epsilons), solutions)
+        front = [objectives for objectives, _ in front]
+        points = [objectives for objectives, _ in solutions]
+        # few enough points that the grid has at most 4000 cells or so
+        count = int(round(4000 ** (1.0 / nobj)))
+        for reference in ([1.25] * nobj, [1.0] * nobj):
+            for subset in (front[:count], points[:count]):
+                expected = cell_volume(subset, reference)
+                got = pareto.hypervolume(subset, reference)
+                self.assertAlmostEqual(got, expected, 9)
+                estimate = pareto.hypervolume_estimate(subset, reference,
+                                                       20000, seed)
+                self.assertAlmostEqual(estimate, expected, 1)
+
+        indicator = pareto.eps_indicator(front, points)
+        self.assertTrue(indicator < max(epsilons))
+        expected = max([min([max([x - rr for x, rr in zip(point, target)])
+                             for point in front]) for target in points])
+        self.assertAlmostEqual(indicator, expected, 12)
+        self.assertEqual(pareto.eps_indicator(front, front), 0.0)
+
+        distance = pareto.generational_distance(points, front)
+        expected = sum([min([math.sqrt(sum([(x - rr) ** 2 for x, rr in
+                                            zip(point, target)]))
+                             for target in front])
+                        for point in points]) / len(points)
+        self.assertAlmostEqual(distance, expected, 12)
+        self.assertEqual(pareto.generational_distance(front, front), 0.0)
+
+    def test_small(self):
+        for seed in range(10):
+            for nobj in (2, 3):
+                self.check(seed, 100, nobj)
+
+    def test_objectives(self):
+        for nobj in range(1, 6):
+            self.check(nobj, 300, nobj)
+
+@unittest.skipIf(pareto.get_kernel() is None, "needs Numba")
+class TestBoxScanKernel(unittest.TestCase):
+    """
+    CompactArchive with the compiled box_scan gives the same front, in the
+    same order, with the same SortStats, as Archive and as CompactArchive
+    in pure Python
+    """
+    def check(self, seed, nrow, nobj):
+        solutions = tie_solutions(seed, nrow, nobj)
+        epsilons = [0.1] * nobj
+        expected = sorted_into(pareto.Archive(epsilons), solutions)
+
+        python = pareto.CompactArchive(epsilons)
+        python.kernel = None
+        python.numpy = None
+        self.assertEqual(sorted_into(python, solutions), expected)
+
+        compiled = pareto.CompactArchive(epsilons)
+        compiled.kernel = pareto.get_kernel()
+        self.assertEqual(sorted_into(compiled, solutions), expected)
+
+    def test_small(self):
+        for seed in range(20):
+            self.check(seed, 200, 3)
+
+    def test_objectives(self):
+        for nobj in (1, 2, 4, 6):
+            self.check(nobj, 2000, nobj)
+
+    def test_large_front(self):
+        self.check(99, 5000, 5)
+
+@unittest.skipIf(pareto.get_numpy() is None, "needs NumPy")
+class TestEngine(unittest.TestCase):
+    """
+    eps_sort_indices keeps the rows an Archive keeps, in the same order,
+    however it blocks its comparisons, and the NumPy engine flags the
+    same rows as the Python engine.  Keyword arguments for the row-by-row
+    sort are not dropped.
+    """
+    def check(self, seed, nrow, nobj):
+        np = pareto.get_numpy()
+        for offset in (0.0, -0.5):
+            solutions = shifted(tie_solutions(seed, nrow, nobj), offset)
+            epsilons = [0.1 * (ii + 1) for ii in range(nobj)]
+            expected, _ = sorted_into(pareto.Archive(epsilons), solutions)
+            expected = [tagalong for _, tagalong in expected]
+            matrix = np.array([objectives for objectives, _ in solutions])
+            for blocksize, frontblock in ((2**22, 256), (50, 3), (1, 1)):
+                got = pareto.eps_sort_indices(matrix, epsilons, blocksize,
+                                              frontblock)
+                self.assertEqual(got.tolist(), expected)
+            flags = pareto.flag_nondominated(matrix, None, epsilons,
+                                             maximize=[0])
+            rows = matrix.tolist()
+            self.assertEqual(flags.tolist(), pareto.flag_nondominated(
+                rows, None, epsilons, maximize=[0], engine="python"))
+
+    def test_small(self):
+        for seed in range(20):
+            for nobj in (2, 3):
+                self.check(seed, 200, nobj)
+
+    def test_objectives(self):
+        for nobj in range(1, 6):
+            self.check(nobj, 2000, nobj)
+
+    def test_rowwise_keywords(self):
+        np = pareto.get_numpy()
+        solutions = tie_solutions(5, 500, 3)
+        rows = [objectives + [tagalong] for objectives, tagalong in solutions]
+        matrix = np.array(rows)
+        expected = pareto.eps_sort([rows], [0, 1, 2], [0.1] * 3)
+        stats = pareto.SortStats()
+        got = pareto.eps_sort(matrix, [0, 1, 2], [0.1] * 3, stats=stats)
+        self.assertEqual(got, expected)
+        self.assertEqual(stats.candidates, len(rows))
+        self.assertTrue(stats.comparisons > 0)
+        self.assertRaises(TypeError, pareto.eps_sort, matrix, [0, 1, 2],
+                          [0.1] * 3, engine="numpy", archive="list")
+        self.assertRaises(TypeError, pareto.flag_nondominated, matrix,
+                          engine="numpy", presort="sum")
+
+class SerialPool(object):
+    """ stands in for a multiprocessing.Pool in merge_tree """
+    def map(self, function, tasks, chunksize=None):
+        return [function(task) for task in tasks]
+
+class TestParallelSort(unittest.TestCase):
+    """
+    Merging the fronts of consecutive shards, pairwise or all at once,
+    gives the same front, in the same order, as sorting everything into
+    an Archive, and so does eps_sort with jobs
+    """
+    def check(self, seed, nrow, nobj):
+        solutions = tie_solutions(seed, nrow, nobj)
+        epsilons = [0.1] * nobj
+        expected, _ = sorted_into(pareto.Archive(epsilons), solutions)
+        for nshards in (1, 2, 3, 5, 8):
+            step = nrow // nshards + 1
+            fronts = [sorted_into(pareto.Archive(epsilons),
+                                  solutions[start:start + step])[0]
+                      for start in range(0, nrow, step)]
+            for archive in sorted(pareto.ARCHIVES):
+                got = pareto.merge_fronts(fronts, epsilons, archive)
+                self.assertEqual([(list(objectives), tagalong)
+                                  for objectives, tagalong in got], expected)
+            got = pareto.merge_tree(fronts, pareto.merge_pair, SerialPool(),
+                                    epsilons, "box", "archive")
+            self.assertEqual([(list(objectives), tagalong)
+                              for objectives, tagalong in got], expected)
+
+    def test_small(self):
+        for seed in range(20):
+            for nobj in (2, 3):
+                self.check(seed, 200, nobj)
+
+    def test_objectives(self):
+        for nobj in range(1, 6):
+            self.check(nobj, 2000, nobj)
+
+    def test_jobs(self):
+        rows = [objectives + [tagalong]
+                for objectives, tagalong in tie_solutions(7, 3000, 4)]
+        tables = [rows[:500], rows[500:1900], rows[1900:]]
+        objectives = [0, 1, 2, 3]
+        for kwargs in ({}, {"attribution": True}, {"maximize": [1]},
+                       {"algorithm": "kung"}, {"archive": "compact"}):
+            expected = pareto.eps_sort(tables, objectives, [0.1] * 4,
+                                       **kwargs)
+            for jobs in (2, 5):
+                got = pareto.eps_sort(tables, objectives, [0.1] * 4,
+                                      jobs=jobs, **kwargs)
+                self.assertEqual(got, expected)
+        np = pareto.get_numpy()
+        if np is not None:
+            arrays = [np.array(table) for table in tables]
+            expected = pareto.eps_sort(tables, objectives, [0.1] * 4,
+                                       attribution=True)
+            for jobs in (1, 2, 5):
+                got = pareto.eps_sort(arrays, objectives, [0.1] * 4,
+                                      jobs=jobs, attribution=True)
+                self.assertEqual(got, expected)
+
+    def test_stats(self):
+        rows = [objectives + [tagalong]
+                for objectives, tagalong in tie_solutions(3, 2000, 3)]
+        expected = pareto.eps_sort([rows], [0, 1, 2], [0.1] * 3)
+        stats = pareto.SortStats()
+        got = pareto.eps_sort([rows], [0, 1, 2], [0.1] * 3, jobs=3,
+                              stats=stats)
+        self.assertEqual(got, expected)
+        # the merges sort the fronts of the shards in again
+        self.assertTrue(stats.candidates > len(rows))
+        self.assertTrue(stats.comparisons > 0)
+        self.assertTrue(stats.peak >= len(expected))
+
+def peeled_ranks(solutions, epsilons):
+    """ ranks by sorting into an Archive, taking the front out, and so on """
+    ranks = [None] * len(solutions)
+    rank = 0
+    left = solutions
+    while left:
+        rank += 1
+        archive = pareto.Archive(epsilons)
+        for objectives, tagalong in left:
+            archive.sortinto(objectives, tagalong)
+        for tagalong in archive.tagalongs:
+            ranks[tagalong] = rank
+        left = [solution for solution in left if ranks[solution[1]] is None]
+    return ranks
+
+class TestRanks(TempFileCase):
+    """ box_ranks ranks solutions as peeling off one front at a time does """
+    def test_peeling(self):
+        for nobj in range(1, 6):
+            for seed in range(3):
+                solutions = tie_solutions(seed, 300, nobj)
+                epsilons = [0.1] * nobj
+                expected = peeled_ranks(solutions, epsilons)
+                points = [objectives for objectives, _ in solutions]
+                self.assertEqual(pareto.box_ranks(points, epsilons),
+                                 expected)
+                capped = [rank if rank <= 3 else None for rank in expected]
+                self.assertEqual(pareto.box_ranks(points, epsilons, 3),
+                                 capped)
+
+    def test_one_objective(self):
+        self.assertEqual(pareto.eps_rank([[3], [1], [2]]), [3, 1, 2])
+        path = self.write("one.txt", "3\n1\n2\n")
+        status, out, err = run_cli(path, "--ranks", "2")
+        self.assertEqual(status, 0, err)
+        self.assertEqual(out.splitlines(), ["1 1", "2 2"])
+
+if __name__ == "__main__":
+    unittest.main()